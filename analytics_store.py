@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Columnar analytics store for coffee shop orders.
+
+Order and line-item columns are copied out of the OLTP tables into plain
+NumPy .npy files (one file per column) that readers open with mmap_mode='r',
+so aggregates run as vectorized NumPy over already-typed arrays instead of
+re-parsing ORDER_DATE text and DECIMAL values out of SQLite rows.
+
+Layout of the store directory:
+    meta.json                 row counts, max IDs, category dictionaries
+    orders/<column>.npy       one row per order, ascending ORDER_ID
+    items/<column>.npy        one row per order line, ascending ORDER_ITEM_ID
+
+meta.json is written last and is the only source of truth for row counts:
+readers slice every column to meta's row count, so a reader never sees a
+half-finished append.
+
+Usage:
+    python analytics_store.py build  [--db coffee_shop.db] [--store analytics_store]
+    python analytics_store.py append [--db coffee_shop.db] [--store analytics_store]
+"""
+
+import sqlite3
+import argparse
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are serialized per process only
+    fcntl = None
+
+STORE_VERSION = 1
+META_FILE = 'meta.json'
+
+# Column name -> (dtype, SQL expression); nulls become -1 (IDs, codes) or 0 (amounts)
+ORDER_COLUMNS = {
+    'order_id': (np.int32, "o.ORDER_ID"),
+    'customer_id': (np.int32, "COALESCE(o.CUSTOMER_ID, -1)"),
+    'order_ts': (np.int64, "CAST(strftime('%s', o.ORDER_DATE) AS INTEGER)"),
+    'payment_code': (np.int16, "o.PAYMENT_METHOD"),
+    'total_cents': (np.int64, "CAST(ROUND(COALESCE(o.TOTAL_AMOUNT, 0) * 100) AS INTEGER)"),
+}
+
+ITEM_COLUMNS = {
+    'order_item_id': (np.int32, "oi.ORDER_ITEM_ID"),
+    'order_id': (np.int32, "oi.ORDER_ID"),
+    'product_id': (np.int32, "COALESCE(oi.PRODUCT_ID, -1)"),
+    'category_code': (np.int16, "c.CATEGORY_NAME"),
+    'quantity': (np.int32, "COALESCE(oi.QUANTITY, 0)"),
+    'unit_cents': (np.int64, "CAST(ROUND(COALESCE(oi.UNIT_PRICE, 0) * 100) AS INTEGER)"),
+    'line_cents': (np.int64, "CAST(ROUND(COALESCE(oi.LINE_AMOUNT, 0) * 100) AS INTEGER)"),
+    # First line of its (order, product) pair, so distinct order counts are a plain sum
+    'first_line': (np.bool_, "oi.LINE_RANK = 1"),
+}
+
+# Text columns stored as int16 codes into meta['dictionaries'][name]
+DICTIONARY_COLUMNS = {
+    'payment_code': 'payment_method',
+    'category_code': 'category',
+}
+
+TABLES = {
+    'orders': {
+        'columns': ORDER_COLUMNS,
+        'query': "SELECT {columns} FROM CYEAE_ORDERS o WHERE o.ORDER_ID > :after AND o.ORDER_ID <= :until "
+                 "ORDER BY o.ORDER_ID",
+        'max_id': "SELECT COALESCE(MAX(ORDER_ID), 0) FROM CYEAE_ORDERS",
+    },
+    'items': {
+        'columns': ITEM_COLUMNS,
+        # LINE_RANK is ranked over every line of the orders in range, including lines
+        # appended earlier, so an order split across appends keeps a single first line
+        'query': "SELECT {columns} FROM ("
+                 "SELECT *, ROW_NUMBER() OVER (PARTITION BY ORDER_ID, PRODUCT_ID ORDER BY ORDER_ITEM_ID) "
+                 "AS LINE_RANK FROM CYEAE_ORDER_ITEMS WHERE ORDER_ID IN ("
+                 "SELECT ORDER_ID FROM CYEAE_ORDER_ITEMS WHERE ORDER_ITEM_ID > :after AND ORDER_ITEM_ID <= :until)"
+                 ") oi "
+                 "LEFT JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID "
+                 "LEFT JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID "
+                 "WHERE oi.ORDER_ITEM_ID > :after AND oi.ORDER_ITEM_ID <= :until ORDER BY oi.ORDER_ITEM_ID",
+        'max_id': "SELECT COALESCE(MAX(ORDER_ITEM_ID), 0) FROM CYEAE_ORDER_ITEMS",
+    },
+}
+
+def append_npy(path, values, rows):
+    """Append values to a 1-D .npy file that holds `rows` valid rows.
+
+    Anything past `rows` (left by an interrupted append) is truncated first.
+    np.save pads the header so the shape can grow in place; if it ever cannot,
+    the file is rewritten.
+    """
+    values = np.ascontiguousarray(values)
+    if not path.exists():
+        np.save(path, values)
+        return
+
+    with open(path, 'r+b') as f:
+        version = npy_format.read_magic(f)
+        if version == (1, 0):
+            _, _, dtype = npy_format.read_array_header_1_0(f)
+        else:
+            _, _, dtype = npy_format.read_array_header_2_0(f)
+        header_len = f.tell()
+        if dtype != values.dtype:
+            raise ValueError(f"{path.name}: cannot append {values.dtype} to {dtype}")
+
+        header = {'descr': npy_format.dtype_to_descr(dtype), 'fortran_order': False,
+                  'shape': (rows + len(values),)}
+        new_header = _npy_header(header, version)
+        if len(new_header) == header_len:
+            f.truncate(header_len + rows * dtype.itemsize)
+            f.seek(0, os.SEEK_END)
+            f.write(values.tobytes())
+            f.flush()
+            f.seek(0)
+            f.write(new_header)
+            return
+
+    existing = np.load(path, mmap_mode='r')[:rows]
+    tmp_path = path.with_name(path.name + '.tmp')
+    np.save(tmp_path, np.concatenate([existing, values]))
+    del existing
+    os.replace(tmp_path, path)
+
+def _npy_header(header, version):
+    buffer = io.BytesIO()
+    if version == (1, 0):
+        npy_format.write_array_header_1_0(buffer, header)
+    else:
+        npy_format.write_array_header_2_0(buffer, header)
+    return buffer.getvalue()
+
+def _pad_add(left, right):
+    if len(left) < len(right):
+        left, right = right, left
+    total = left.copy()
+    total[:len(right)] += right
+    return total
+
+def _product_partial(orders, items):
+    valid = items['product_id'] >= 0
+    product = items['product_id'] if valid.all() else items['product_id'][valid]
+    pick = (lambda column: items[column]) if len(product) == len(valid) else (lambda column: items[column][valid])
+    return (np.bincount(product, weights=pick('quantity')),
+            np.bincount(product, weights=pick('line_cents')),
+            np.bincount(product, weights=pick('first_line')),
+            np.bincount(product).astype(np.float64))
+
+def _category_partial(orders, items):
+    codes = items['category_code']
+    valid = codes >= 0
+    return (np.bincount(codes[valid], weights=items['quantity'][valid]),
+            np.bincount(codes[valid], weights=items['line_cents'][valid]))
+
+def _payment_partial(orders, items):
+    codes = orders['payment_code']
+    valid = codes >= 0
+    return (np.bincount(codes[valid]).astype(np.float64),
+            np.bincount(codes[valid], weights=orders['total_cents'][valid]))
+
+def _daily_partial(orders, items):
+    days = orders['order_ts'] // 86400
+    return (np.bincount(days).astype(np.float64),
+            np.bincount(days, weights=orders['total_cents']))
+
+# Additive per-row-range aggregates: a snapshot adds the rows appended since
+# the snapshot it was opened from to that snapshot's totals instead of rescanning
+PARTIALS = {
+    'product': _product_partial,
+    'category': _category_partial,
+    'payment': _payment_partial,
+    'daily': _daily_partial,
+}
+
+class StoreSnapshot:
+    """Memory-mapped columns of one store state (see OrderColumnStore.open).
+
+    Aggregates are computed once per snapshot; when opened from a previous
+    snapshot (OrderColumnStore.sync) only the newly appended rows are scanned.
+    """
+    def __init__(self, meta, orders, items, base=None):
+        self.meta = meta
+        self.orders = orders
+        self.items = items
+        self.dictionaries = meta['dictionaries']
+        self._partials = {}
+        if base is not None and base.meta.get('created_at') != meta.get('created_at'):
+            base = None  # the store was rebuilt; nothing carries over
+        self._base_partials = dict(base._partials) if base is not None else {}
+        self._base_rows = (len(base.orders['order_id']), len(base.items['order_item_id'])) if base else (0, 0)
+
+    @property
+    def max_order_id(self):
+        return self.meta['tables']['orders']['max_id']
+
+    @property
+    def max_order_item_id(self):
+        return self.meta['tables']['items']['max_id']
+
+    def _partial(self, name):
+        if name not in self._partials:
+            prior = self._base_partials.get(name)
+            order_start, item_start = self._base_rows if prior is not None else (0, 0)
+            orders = {column: values[order_start:] for column, values in self.orders.items()}
+            items = {column: values[item_start:] for column, values in self.items.items()}
+            partial = PARTIALS[name](orders, items)
+            if prior is not None:
+                partial = tuple(_pad_add(old, new) for old, new in zip(prior, partial))
+            self._partials[name] = partial
+        return self._partials[name]
+
+    def daily_sales(self, start_date=None, end_date=None):
+        """(date, order_count, total_sales, avg_order_value) per UTC day, newest first.
+
+        Same rows as CoffeeShopDB.get_sales_report: days without orders are omitted.
+        """
+        counts, cents = self._partial('daily')
+        report = []
+        for day_number in np.flatnonzero(counts)[::-1]:
+            day = str(np.datetime64(int(day_number), 'D'))
+            if (start_date and day < start_date) or (end_date and day > end_date):
+                continue
+            count = int(counts[day_number])
+            total = cents[day_number] / 100.0
+            report.append((day, count, total, total / count))
+        return report
+
+    def product_sales(self):
+        """product_id -> (total_quantity, total_revenue, order_count) for sold products"""
+        quantity, cents, orders, lines = self._partial('product')
+        return {int(pid): (int(quantity[pid]), cents[pid] / 100.0, int(orders[pid]))
+                for pid in np.flatnonzero(lines)}
+
+    def category_sales(self):
+        """category name -> (total_quantity, total_revenue) by the category recorded at append time"""
+        quantity, cents = self._partial('category')
+        names = self.dictionaries['category']
+        return {names[code]: (int(quantity[code]), cents[code] / 100.0)
+                for code in range(len(quantity)) if quantity[code] or cents[code]}
+
+    def payment_sales(self):
+        """payment method -> (order_count, total_revenue)"""
+        counts, cents = self._partial('payment')
+        names = self.dictionaries['payment_method']
+        return {names[code]: (int(counts[code]), cents[code] / 100.0)
+                for code in range(len(counts)) if counts[code]}
+
+class OrderColumnStore:
+    """Append-only columnar copy of CYEAE_ORDERS / CYEAE_ORDER_ITEMS.
+
+    append() copies rows above the stored max IDs; rows are never updated in
+    place, so a rebuild is needed if orders are deleted or rewritten (append
+    does this automatically when the database's max IDs go backwards).
+    """
+    def __init__(self, store_dir='analytics_store'):
+        self.store_dir = Path(store_dir)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._synced_at = 0.0
+
+    def exists(self):
+        return (self.store_dir / META_FILE).exists()
+
+    def load_meta(self):
+        with open(self.store_dir / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported analytics store version: {meta.get('version')}")
+        return meta
+
+    def _empty_meta(self):
+        return {
+            'version': STORE_VERSION,
+            'created_at': datetime.now().isoformat(),
+            'updated_at': None,
+            'tables': {name: {'rows': 0, 'max_id': 0} for name in TABLES},
+            'dictionaries': {name: [] for name in DICTIONARY_COLUMNS.values()},
+        }
+
+    def _save_meta(self, meta):
+        meta['updated_at'] = datetime.now().isoformat(timespec='seconds')
+        tmp_path = self.store_dir / (META_FILE + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, self.store_dir / META_FILE)
+
+    def open(self, base=None):
+        """Memory-map every column (no copies), sliced to the committed row counts"""
+        meta = self.load_meta()
+        columns = {}
+        for table, spec in TABLES.items():
+            rows = meta['tables'][table]['rows']
+            columns[table] = {}
+            for name, (dtype, _) in spec['columns'].items():
+                path = self.store_dir / table / f"{name}.npy"
+                if rows == 0 or not path.exists():
+                    columns[table][name] = np.empty(0, dtype=dtype)
+                else:
+                    columns[table][name] = np.load(path, mmap_mode='r')[:rows]
+        return StoreSnapshot(meta, columns['orders'], columns['items'], base=base)
+
+    def build(self, db_path, chunk_size=100000):
+        """Recreate the store from scratch"""
+        return self.append(db_path, chunk_size=chunk_size, rebuild=True)
+
+    def append(self, db_path, chunk_size=100000, rebuild=False):
+        """Copy rows added since the last append; returns {table: rows appended}"""
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.store_dir / '.lock', 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if rebuild:
+                self._clear()
+            appended = self._append(db_path, chunk_size)
+            if appended is None:
+                # Rows were deleted (e.g. demo_data --reset-orders); start over
+                print("Database IDs moved backwards; rebuilding analytics store")
+                self._clear()
+                appended = self._append(db_path, chunk_size)
+            return appended
+
+    def _clear(self):
+        for table in TABLES:
+            shutil.rmtree(self.store_dir / table, ignore_errors=True)
+        (self.store_dir / META_FILE).unlink(missing_ok=True)
+
+    def _append(self, db_path, chunk_size):
+        meta = self.load_meta() if self.exists() else self._empty_meta()
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            # One read transaction, so orders and their lines come from the same point in time
+            conn.execute("BEGIN")
+            targets = {table: conn.execute(spec['max_id']).fetchone()[0] for table, spec in TABLES.items()}
+            if any(targets[table] < meta['tables'][table]['max_id'] for table in TABLES):
+                return None
+            appended = {table: self._append_table(conn, meta, table, spec, targets[table], chunk_size)
+                        for table, spec in TABLES.items()}
+        finally:
+            conn.close()
+
+        self._save_meta(meta)
+        return appended
+
+    def _append_table(self, conn, meta, table, spec, target_id, chunk_size):
+        table_meta = meta['tables'][table]
+        columns = spec['columns']
+        table_dir = self.store_dir / table
+        table_dir.mkdir(exist_ok=True)
+
+        cursor = conn.execute(
+            spec['query'].format(columns=", ".join(expr for _, expr in columns.values())),
+            {'after': table_meta['max_id'], 'until': target_id})
+        appended = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for index, (name, (dtype, _)) in enumerate(columns.items()):
+                raw = [row[index] for row in chunk]
+                if name in DICTIONARY_COLUMNS:
+                    values = self._encode(meta['dictionaries'][DICTIONARY_COLUMNS[name]], raw)
+                else:
+                    values = np.array(raw, dtype=dtype)
+                append_npy(table_dir / f"{name}.npy", values, table_meta['rows'])
+            table_meta['rows'] += len(chunk)
+            table_meta['max_id'] = chunk[-1][0]
+            appended += len(chunk)
+        cursor.close()
+        table_meta['max_id'] = max(table_meta['max_id'], target_id)
+        return appended
+
+    @staticmethod
+    def _encode(dictionary, raw):
+        """Map text values to int16 codes, extending the dictionary as needed (None -> -1)"""
+        lookup = {value: code for code, value in enumerate(dictionary)}
+        codes = np.empty(len(raw), dtype=np.int16)
+        for i, value in enumerate(raw):
+            if value is None:
+                codes[i] = -1
+                continue
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes[i] = code
+        return codes
+
+    def sync(self, db_path, max_age=1.0):
+        """Append new rows at most once per max_age seconds and return an open snapshot"""
+        now = time.monotonic()
+        with self._lock:
+            if self._snapshot is not None and now - self._synced_at < max_age:
+                return self._snapshot
+        appended = self.append(db_path)
+        with self._lock:
+            if self._snapshot is None or any(appended.values()):
+                self._snapshot = self.open(base=self._snapshot)
+            self._synced_at = now
+            return self._snapshot
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update the columnar analytics store')
+    parser.add_argument('command', choices=['build', 'append'], help='Rebuild from scratch or append new rows')
+    parser.add_argument('--db', default='coffee_shop.db', help='Database file path')
+    parser.add_argument('--store', default='analytics_store', help='Store directory')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows copied per chunk')
+    args = parser.parse_args()
+
+    store = OrderColumnStore(args.store)
+    start = time.perf_counter()
+    if args.command == 'build':
+        appended = store.build(args.db, chunk_size=args.chunk_size)
+    else:
+        appended = store.append(args.db, chunk_size=args.chunk_size)
+    meta = store.load_meta()
+    print(f"Appended {appended['orders']} orders / {appended['items']} order lines "
+          f"in {time.perf_counter() - start:.2f}s")
+    print(f"Store {args.store}: {meta['tables']['orders']['rows']} orders, "
+          f"{meta['tables']['items']['rows']} order lines")
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,169 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, send_from_directory
+from flask import Flask, request, jsonify, render_template, redirect, url_for, session, send_from_directory, Response
+from flask.json.provider import DefaultJSONProvider
 import os
+import gzip
+import mimetypes
+import zlib
+from functools import lru_cache
 from flask_cors import CORS
-from database import CoffeeShopDB
+from werkzeug.utils import safe_join
+from database import CoffeeShopDB, CatalogCache, ReportCache, TTLCache, VerificationRequired, encode_order_cursor, decode_order_cursor
+from build_assets import ASSET_URL_PREFIX, MANIFEST_FILE, load_manifest
 import json
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used instead
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding with orjson when it is installed.
+
+    Keys are sorted like the default provider; dates and other non-native
+    types still go through DefaultJSONProvider.default so output matches.
+    """
+    options = (orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        # jsonify always passes compact separators (orjson's only style) or indent=2 in debug;
+        # any other customisation falls back to the stdlib encoder
+        layout = {key: kwargs.pop(key) for key in ('indent', 'separators') if key in kwargs}
+        indent = layout.get('indent')
+        if orjson is None or kwargs or indent not in (None, 2):
+            return super().dumps(obj, **kwargs, **layout)
+        option = self.options | orjson.OPT_INDENT_2 if indent else self.options
+        return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = 'change-this-secret'  
 CORS(app)
 
 db = CoffeeShopDB()
+# Optional group-commit mode for order ingestion under concurrent load
+if os.environ.get('ORDER_WRITE_BEHIND') == '1':
+    db.enable_write_behind(
+        max_batch=int(os.environ.get('ORDER_WRITE_BATCH', 64)),
+        flush_interval_ms=float(os.environ.get('ORDER_WRITE_FLUSH_MS', 5))
+    )
+catalog_cache = CatalogCache(db)
+# /api/reports/* responses, reused until an order or customer write bumps CYEAE_DATA_VERSION
+report_cache = ReportCache(db, max_entries=int(os.environ.get('REPORT_CACHE_ENTRIES', 256)))
+# Admin dashboard payload shared by every open admin tab for DASHBOARD_TTL seconds
+dashboard_cache = TTLCache(ttl=float(os.environ.get('DASHBOARD_TTL', 2)))
+# Seconds between keep-alive comments on idle /api/admin/orders/stream connections
+ORDER_STREAM_KEEPALIVE = float(os.environ.get('ORDER_STREAM_KEEPALIVE', 15))
+# Optional memory-mapped columnar store backing /api/reports/sales and /products;
+# opened on first use so workers without it never import NumPy
+ANALYTICS_STORE_DIR = os.environ.get('ANALYTICS_STORE')
+analytics_store = None
+
+# Optional fingerprinted assets written by build_assets.py, served as immutable from /assets/
+assets_dist = os.path.join(app.root_path, os.environ['ASSETS_DIST']) if os.environ.get('ASSETS_DIST') else None
+asset_manifest = load_manifest(assets_dist) if assets_dist else {}
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+@app.template_global()
+def asset_url(filename):
+    """Hashed /assets/ URL for a static file when assets are built, else the plain static URL"""
+    hashed = asset_manifest.get(filename)
+    if hashed:
+        return ASSET_URL_PREFIX + hashed
+    return url_for('static', filename=filename)
+
+def report_store():
+    """Analytics store snapshot caught up with the database, or None if not configured.
+
+    Only called while building a report_cache entry, after its data version
+    was read; syncing here (not up to a second ago) keeps the payload at
+    least as new as the version it is cached under.
+    """
+    global analytics_store
+    if not ANALYTICS_STORE_DIR:
+        return None
+    if analytics_store is None:
+        from analytics_store import OrderColumnStore
+        analytics_store = OrderColumnStore(ANALYTICS_STORE_DIR)
+    return analytics_store.sync(db.db_manager.db_path, max_age=0)
+
+# JSON bodies smaller than this are sent uncompressed
+GZIP_MIN_SIZE = int(os.environ.get('GZIP_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+
+def accepts_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+@lru_cache(maxsize=64)
+def gzip_payload(payload):
+    """Compressed copy of a cached payload; the same bytes object is compressed once."""
+    return gzip.compress(payload, compresslevel=GZIP_LEVEL)
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    """gzip JSON responses (buffered or streamed) for clients that accept it."""
+    if response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+        return response
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or not accepts_gzip():
+        return response
+    if response.is_streamed:
+        response.response = gzip_stream(response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < GZIP_MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def cached_json_response(payload, etag, last_modified=None):
+    """Serve a pre-serialized JSON payload, answering If-None-Match/If-Modified-Since with 304."""
+    # Compressed variants get their own ETag so the two encodings never validate each other
+    if len(payload) >= GZIP_MIN_SIZE and accepts_gzip():
+        response = Response(gzip_payload(payload), mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        etag += '-gzip'
+    else:
+        response = Response(payload, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def wants_columnar():
+    return request.args.get('format') == 'columnar'
+
+def columnar_payload(columns, rows, **extra):
+    """Serialize row tuples as parallel arrays: {"columns": [...], "data": {column: [values]}}.
+
+    columns is a list of (name, convert) pairs; rows are transposed with zip,
+    so no per-row dict is ever built.
+    """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    data = {}
+    for (name, convert), column in zip(columns, values):
+        data[name] = list(map(convert, column)) if convert else list(column)
+    return app.json.dumps({'success': True, 'format': 'columnar', 'columns': [name for name, _ in columns],
+                           'count': len(rows), 'data': data, **extra})
+
+def cached_report_response(build, *args):
+    """Serve a report from report_cache, keyed by endpoint and query args."""
+    key = (request.endpoint, tuple(sorted(request.args.items(multi=True))))
+    payload, etag, last_modified = report_cache.get(key, lambda: build(*args, columnar=wants_columnar()))
+    return cached_json_response(payload, etag, last_modified)
 
 @app.route('/')
 def index():
@@ -39,35 +193,43 @@ def admin_logout():
     return redirect(url_for('admin_login'))
 
 
+def build_products_payload():
+    products = db.get_all_products()
+    product_list = []
+    for product in products:
+        product_list.append({
+            'id': product[0],
+            'name': product[1],
+            'price': float(product[2]),
+            'is_active': product[3],
+            'category': product[4]
+        })
+    return app.json.dumps({'success': True, 'data': product_list})
+
+def build_categories_payload():
+    categories = db.get_categories()
+    category_list = []
+    for category in categories:
+        category_list.append({
+            'id': category[0],
+            'name': category[1],
+            'description': category[2]
+        })
+    return app.json.dumps({'success': True, 'data': category_list})
+
 @app.route('/api/products', methods=['GET'])
 def get_products():
     try:
-        products = db.get_all_products()
-        product_list = []
-        for product in products:
-            product_list.append({
-                'id': product[0],
-                'name': product[1],
-                'price': float(product[2]),
-                'is_active': product[3],
-                'category': product[4]
-            })
-        return jsonify({'success': True, 'data': product_list})
+        payload, etag = catalog_cache.get('products', build_products_payload)
+        return cached_json_response(payload, etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
     try:
-        categories = db.get_categories()
-        category_list = []
-        for category in categories:
-            category_list.append({
-                'id': category[0],
-                'name': category[1],
-                'description': category[2]
-            })
-        return jsonify({'success': True, 'data': category_list})
+        payload, etag = catalog_cache.get('categories', build_categories_payload)
+        return cached_json_response(payload, etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -184,88 +346,83 @@ def create_order():
         data = request.get_json()
         
         customer_id = data.get('customer_id')
-        if not customer_id:
-            customer_name = data['customer_name']
-            customer_email = data.get('customer_email', '')
-            customer_phone = data.get('customer_phone', '')
-            
-            if customer_email or customer_phone:
-                existing_customer = db.find_customer_by_name_and_email(customer_name, customer_email if customer_email else None)
-                if existing_customer:
-                    customer_id = existing_customer[0]
-                else:
-                    customer_id = db.create_customer(
-                        name=customer_name,
-                        phone=customer_phone,
-                        email=customer_email,
-                        address=data.get('customer_address', '')
-                    )
-            else:
-                potential_members = db.find_potential_members_by_name(customer_name)
-                if potential_members:
-                    force_regular = data.get('force_regular', False)
-                    if force_regular:
-                        customer_id = db.create_customer(
-                            name=customer_name,
-                            phone=customer_phone,
-                            email=customer_email,
-                            address=data.get('customer_address', '')
-                        )
-                    else:
-                        return jsonify({
-                            'success': False, 
-                            'error': 'VERIFICATION_REQUIRED',
-                            'message': f'Found potential member(s) with name "{customer_name}". Please provide email or phone for verification.'
-                        }), 400
-                else:
-                    customer_id = db.create_customer(
-                        name=customer_name,
-                        phone=customer_phone,
-                        email=customer_email,
-                        address=data.get('customer_address', '')
-                    )
-        
-        # Apply member default preferences (if provided or available)
-        payment_method = data.get('payment_method')
-        if not payment_method and customer_id:
-            # try read member default_pay
-            prefs = db.get_member_preferences(customer_id)
-            for p in prefs:
-                if p[0] == 'default_pay':
-                    payment_method = p[1]
-                    break
-        if not payment_method:
-            payment_method = 'cash'
-
-        order_id = db.create_order(
+        order_id, customer_id = db.place_order(
+            order_items=data['items'],
             customer_id=customer_id,
-            payment_method=payment_method,
-            order_items=data['items']
+            customer_name=None if customer_id else data['customer_name'],
+            customer_email=data.get('customer_email', ''),
+            customer_phone=data.get('customer_phone', ''),
+            customer_address=data.get('customer_address', ''),
+            payment_method=data.get('payment_method'),
+            force_regular=data.get('force_regular', False)
         )
+        # Writes from this process show up in reports immediately, others within check_interval
+        report_cache.expire()
         
         return jsonify({'success': True, 'order_id': order_id})
+    except VerificationRequired as e:
+        return jsonify({
+            'success': False, 
+            'error': 'VERIFICATION_REQUIRED',
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def order_row_to_dict(order):
+    return {
+        'order_id': order[0],
+        'customer_name': order[1],
+        'order_date': order[2],
+        'payment_method': order[3],
+        'total_amount': float(order[4]) if order[4] is not None else 0.0
+    }
+
+ORDER_COLUMNS = [('order_id', None), ('customer_name', None), ('order_date', None), ('payment_method', None),
+                 ('total_amount', lambda value: float(value) if value is not None else 0.0)]
+
+def stream_order_list(orders):
+    """Emit {"success": true, "data": [...]} one order at a time."""
+    yield '{"success": true, "data": ['
+    for i, order in enumerate(orders):
+        yield (',' if i else '') + app.json.dumps(order_row_to_dict(order))
+    yield ']}'
+
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
     try:
         if not session.get('admin_logged_in'):
             return jsonify({'success': False, 'error': 'Unauthorized'}), 401
         customer_id = request.args.get('customer_id')
-        orders = db.get_order_history(customer_id)
-        
-        order_list = []
-        for order in orders:
-            order_list.append({
-                'order_id': order[0],
-                'customer_name': order[1],
-                'order_date': order[2],
-                'payment_method': order[3],
-                'total_amount': float(order[4]) if order[4] is not None else 0.0
-            })
+        after = request.args.get('after')
+        limit = request.args.get('limit', type=int)
+        # Reject a bad cursor with 400 before any response (streamed or not) is started
+        if after:
+            decode_order_cursor(after)
+
+        # Columnar pages are transposed in memory, so unbounded history is only streamed as rows
+        if limit is None and wants_columnar():
+            return jsonify({'success': False,
+                            'error': 'format=columnar requires limit (max 1000); page with next_cursor'}), 400
+
+        # Without a limit the full history is streamed in keyset pages so memory stays flat
+        if limit is None:
+            orders = db.iter_order_history(customer_id, after=after)
+            return Response(stream_order_list(orders), mimetype='application/json')
+
+        limit = max(1, min(limit, 1000))
+        orders = db.get_order_history(customer_id, limit=limit, after=after)
+        next_cursor = None
+        if len(orders) == limit:
+            next_cursor = encode_order_cursor(orders[-1][2], orders[-1][0])
+        if wants_columnar():
+            return Response(columnar_payload(ORDER_COLUMNS, orders, next_cursor=next_cursor),
+                            mimetype='application/json')
+        order_list = [order_row_to_dict(order) for order in orders]
         
-        return jsonify({'success': True, 'data': order_list})
+        return jsonify({'success': True, 'data': order_list, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -290,67 +447,95 @@ def get_order_details(order_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def report_float(value):
+    return float(value) if value else 0
+
+SALES_REPORT_COLUMNS = [('date', None), ('order_count', None), ('total_sales', report_float),
+                        ('avg_order_value', report_float)]
+PRODUCT_REPORT_COLUMNS = [('product_name', None), ('category', None), ('total_quantity', None),
+                          ('total_revenue', report_float), ('order_count', None)]
+CUSTOMER_REPORT_COLUMNS = [('customer_id', None), ('customer_name', None), ('customer_type', None),
+                           ('order_count', lambda value: value if value else 0), ('total_spent', report_float),
+                           ('avg_order_value', report_float), ('last_order_date', None)]
+
+def build_sales_report_payload(start_date, end_date, columnar=False):
+    report = db.get_sales_report(start_date, end_date, store=report_store())
+    if columnar:
+        return columnar_payload(SALES_REPORT_COLUMNS, report)
+    
+    report_data = []
+    for row in report:
+        report_data.append({
+            'date': row[0],
+            'order_count': row[1],
+            'total_sales': float(row[2]) if row[2] else 0,
+            'avg_order_value': float(row[3]) if row[3] else 0
+        })
+    return app.json.dumps({'success': True, 'data': report_data})
+
+def build_product_report_payload(columnar=False):
+    report = db.get_product_sales_report(store=report_store())
+    if columnar:
+        return columnar_payload(PRODUCT_REPORT_COLUMNS, report)
+    
+    report_data = []
+    for row in report:
+        report_data.append({
+            'product_name': row[0],
+            'category': row[1],
+            'total_quantity': row[2],
+            'total_revenue': float(row[3]) if row[3] else 0,
+            'order_count': row[4]
+        })
+    return app.json.dumps({'success': True, 'data': report_data})
+
+def build_customer_report_payload(columnar=False):
+    report = db.get_customer_report()
+    if columnar:
+        return columnar_payload(CUSTOMER_REPORT_COLUMNS, report)
+    
+    report_data = []
+    for row in report:
+        report_data.append({
+            'customer_id': row[0],  
+            'customer_name': row[1],
+            'customer_type': row[2],
+            'order_count': row[3] if row[3] else 0,
+            'total_spent': float(row[4]) if row[4] else 0,
+            'avg_order_value': float(row[5]) if row[5] else 0,
+            'last_order_date': row[6]
+        })
+    return app.json.dumps({'success': True, 'data': report_data})
+
 @app.route('/api/reports/sales', methods=['GET'])
 def get_sales_report():
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        
-        report = db.get_sales_report(start_date, end_date)
-        
-        report_data = []
-        for row in report:
-            report_data.append({
-                'date': row[0],
-                'order_count': row[1],
-                'total_sales': float(row[2]) if row[2] else 0,
-                'avg_order_value': float(row[3]) if row[3] else 0
-            })
-        
-        return jsonify({'success': True, 'data': report_data})
+        return cached_report_response(build_sales_report_payload, start_date, end_date)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/reports/products', methods=['GET'])
 def get_product_sales_report():
     try:
-        report = db.get_product_sales_report()
-        
-        report_data = []
-        for row in report:
-            report_data.append({
-                'product_name': row[0],
-                'category': row[1],
-                'total_quantity': row[2],
-                'total_revenue': float(row[3]) if row[3] else 0,
-                'order_count': row[4]
-            })
-        
-        return jsonify({'success': True, 'data': report_data})
+        return cached_report_response(build_product_report_payload)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/reports/customers', methods=['GET'])
 def get_customer_report():
     try:
-        report = db.get_customer_report()
-        
-        report_data = []
-        for row in report:
-            report_data.append({
-                'customer_id': row[0],  
-                'customer_name': row[1],
-                'customer_type': row[2],
-                'order_count': row[3] if row[3] else 0,
-                'total_spent': float(row[4]) if row[4] else 0,
-                'avg_order_value': float(row[5]) if row[5] else 0,
-                'last_order_date': row[6]
-            })
-        
-        return jsonify({'success': True, 'data': report_data})
+        return cached_report_response(build_customer_report_payload)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/cache/stats', methods=['GET'])
+def get_cache_stats():
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    return jsonify({'success': True, 'data': {'reports': report_cache.stats()}})
+
 @app.route('/api/member/preferences', methods=['GET', 'POST'])
 def manage_member_preferences():
     try:
@@ -403,6 +588,50 @@ def manage_member_preferences():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/admin/dashboard', methods=['GET'])
+def get_admin_dashboard():
+    try:
+        if not session.get('admin_logged_in'):
+            return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+        
+        def build_dashboard_payload():
+            return app.json.dumps({'success': True, 'data': db.get_dashboard(days=7, top_n=5),
+                                   'generated_at': datetime.now().isoformat(timespec='seconds')})
+        
+        payload, _ = dashboard_cache.get('dashboard', build_dashboard_payload)
+        response = Response(payload, mimetype='application/json')
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def stream_order_events(after_id):
+    """SSE frames for orders committed after after_id, with a comment line as keep-alive."""
+    yield 'retry: 3000\n\n'
+    while True:
+        events = db.order_feed.read(after_id, timeout=ORDER_STREAM_KEEPALIVE)
+        if not events:
+            yield ': keep-alive\n\n'
+            continue
+        for order_id, order in events:
+            yield f'id: {order_id}\nevent: order\ndata: {app.json.dumps(order)}\n\n'
+        after_id = events[-1][0]
+
+@app.route('/api/admin/orders/stream', methods=['GET'])
+def stream_orders():
+    if not session.get('admin_logged_in'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+    # EventSource resends the last id it saw on reconnect; ?last_event_id= covers the first connect
+    after_id = request.headers.get('Last-Event-ID', type=int)
+    if after_id is None:
+        after_id = request.args.get('last_event_id', type=int)
+    if after_id is None:
+        after_id = db.order_feed.position()
+    response = Response(stream_order_events(after_id), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/api/admin/member/<int:customer_id>', methods=['GET'])
 def get_member_details(customer_id):
     try:
@@ -433,11 +662,11 @@ def get_member_details(customer_id):
                 'order_count': fav[4]
             })
         
-        orders = db.get_order_history(customer_id)
+        stats = db.get_customer_stats(customer_id)
         order_stats = {
-            'total_orders': len(orders),
-            'total_spent': sum(float(order[4]) for order in orders) if orders else 0,
-            'last_order_date': orders[0][2] if orders else None
+            'total_orders': stats[0] if stats else 0,
+            'total_spent': float(stats[1]) if stats and stats[1] else 0,
+            'last_order_date': stats[3] if stats else None
         }
         
         return jsonify({
@@ -460,6 +689,28 @@ def get_member_details(customer_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    if not assets_dist:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    if filename == MANIFEST_FILE:
+        # The manifest keeps its name across rebuilds, so it must be revalidated (ETag)
+        response = send_from_directory(assets_dist, filename, max_age=0)
+        response.cache_control.no_cache = True
+        return response
+    compressed = safe_join(assets_dist, filename + '.gz')
+    if compressed and os.path.isfile(compressed) and accepts_gzip():
+        response = send_from_directory(assets_dist, filename + '.gz', max_age=ASSET_MAX_AGE,
+                                       mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(assets_dist, filename, max_age=ASSET_MAX_AGE)
+    # Hashed names never change content, so browsers need not revalidate
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 # Serve images under /picture/* from static/picture directory
 @app.route('/picture/<path:filename>')
 def serve_picture(filename):
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Fingerprinted static assets for long-lived browser caching.
+
+Every file under static/ is copied to static/dist/ under a content-hashed
+name (css/style.css -> css/style.<hash>.css), so a changed file always gets
+a new URL and the served copies can be cached as immutable. Text assets get
+a precompressed .gz sibling. References to other assets inside CSS and JS
+(/static/..., /picture/... and relative url(...)) are rewritten to the
+hashed names before those files are hashed themselves.
+
+manifest.json maps each logical path to its hashed path and is written
+last, atomically; hashed files are only ever added, so a running server
+keeps serving the names from the manifest it loaded until --clean is used.
+
+Usage:
+    python build_assets.py [--static static] [--dist static/dist] [--clean]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import time
+from pathlib import Path
+
+MANIFEST_FILE = 'manifest.json'
+ASSET_URL_PREFIX = '/assets/'
+# Text assets are rewritten and precompressed; everything else is copied as-is
+TEXT_SUFFIXES = {'.css', '.js', '.svg', '.json', '.txt'}
+# Files that may reference others are built last, CSS before JS
+BUILD_ORDER = {'.css': 1, '.js': 2}
+# A .gz sibling is only kept if it is at least this much smaller
+GZIP_MIN_SAVING = 0.1
+
+REFERENCE_PATTERN = re.compile(r"(?P<prefix>/static/|/picture/)(?P<path>[\w.\-/]+)")
+CSS_URL_PATTERN = re.compile(r"url\(\s*(['\"]?)(?!/|data:|https?:|#)(?P<path>[^'\")]+)\1\s*\)")
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def hashed_name(logical, data):
+    directory, filename = posixpath.split(logical)
+    stem, suffix = posixpath.splitext(filename)
+    return posixpath.join(directory, f"{stem}.{fingerprint(data)}{suffix}")
+
+def rewrite_references(text, logical, manifest):
+    """Point /static/, /picture/ and relative CSS url() references at hashed names."""
+    def absolute(match):
+        path = match['path'] if match['prefix'] == '/static/' else 'picture/' + match['path']
+        hashed = manifest.get(path)
+        return ASSET_URL_PREFIX + hashed if hashed else match.group(0)
+
+    def relative(match):
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(logical), match['path']))
+        hashed = manifest.get(path)
+        return f"url({ASSET_URL_PREFIX}{hashed})" if hashed else match.group(0)
+
+    text = REFERENCE_PATTERN.sub(absolute, text)
+    if logical.endswith('.css'):
+        text = CSS_URL_PATTERN.sub(relative, text)
+    return text
+
+def load_manifest(dist_dir):
+    """logical path -> hashed path, or {} if the assets have not been built"""
+    try:
+        with open(Path(dist_dir) / MANIFEST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _write_once(path, data):
+    # Hashed names are immutable: an existing file already has this content
+    if path.exists():
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def build_assets(static_dir='static', dist_dir='static/dist', clean=False):
+    """Write hashed copies and .gz siblings of static_dir into dist_dir; returns the manifest"""
+    static_dir = Path(static_dir).resolve()
+    dist_dir = Path(dist_dir).resolve()
+    sources = sorted(
+        (path for path in static_dir.rglob('*')
+         if path.is_file() and dist_dir not in path.parents and not path.name.startswith('.')),
+        key=lambda path: (BUILD_ORDER.get(path.suffix, 0), path.as_posix())
+    )
+
+    manifest = {}
+    written = set()
+    for source in sources:
+        logical = source.relative_to(static_dir).as_posix()
+        data = source.read_bytes()
+        if source.suffix in TEXT_SUFFIXES:
+            data = rewrite_references(data.decode('utf-8'), logical, manifest).encode('utf-8')
+        hashed = hashed_name(logical, data)
+        manifest[logical] = hashed
+        _write_once(dist_dir / hashed, data)
+        written.add(hashed)
+
+        if source.suffix in TEXT_SUFFIXES:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) <= len(data) * (1 - GZIP_MIN_SAVING):
+                _write_once(dist_dir / (hashed + '.gz'), compressed)
+                written.add(hashed + '.gz')
+
+    tmp_manifest = dist_dir / (MANIFEST_FILE + '.tmp')
+    dist_dir.mkdir(parents=True, exist_ok=True)
+    tmp_manifest.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp_manifest, dist_dir / MANIFEST_FILE)
+
+    if clean:
+        for path in dist_dir.rglob('*'):
+            if path.is_file() and path.name != MANIFEST_FILE \
+                    and path.relative_to(dist_dir).as_posix() not in written:
+                path.unlink()
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description='Fingerprint and precompress static assets')
+    parser.add_argument('--static', default='static', help='Source static directory')
+    parser.add_argument('--dist', default='static/dist', help='Output directory for hashed assets')
+    parser.add_argument('--clean', action='store_true', help='Remove hashed files no longer in the manifest')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    manifest = build_assets(args.static, args.dist, clean=args.clean)
+    compressed = sum(1 for hashed in manifest.values() if (Path(args.dist) / (hashed + '.gz')).exists())
+    print(f"Built {len(manifest)} assets ({compressed} precompressed) into {args.dist} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main()
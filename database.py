@@ -1,54 +1,686 @@
 import sqlite3
 import hashlib
-from datetime import datetime, date
+import base64
+import threading
+import weakref
+import time
+import queue
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime, date, timedelta, timezone
+
+class VerificationRequired(Exception):
+    """A guest checkout name matches a member and needs email or phone to continue."""
+
+# Idempotent schema additions applied once per DatabaseManager to existing databases
+SCHEMA_SCRIPTS = [
+    """
+    CREATE TABLE IF NOT EXISTS CYEAE_CATALOG_VERSION (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        VERSION INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO CYEAE_CATALOG_VERSION (ID, VERSION) VALUES (1, 0);
+    """ + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_{event.lower()}_catalog_version
+    AFTER {event} ON CYEAE_{table}
+    BEGIN
+        UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+    END;
+    """ for table in ('PRODUCT', 'CATEGORY') for event in ('INSERT', 'UPDATE', 'DELETE')),
+    """
+    CREATE INDEX IF NOT EXISTS idx_orders_customer_date ON CYEAE_ORDERS(CUSTOMER_ID, ORDER_DATE);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CYEAE_DAILY_SALES (
+        SALES_DATE DATE PRIMARY KEY,
+        ORDER_COUNT INTEGER NOT NULL DEFAULT 0,
+        TOTAL_SALES DECIMAL(14,2) NOT NULL DEFAULT 0,
+        AVG_ORDER_VALUE DECIMAL(12,2) NOT NULL DEFAULT 0
+    );
+    INSERT INTO CYEAE_DAILY_SALES (SALES_DATE, ORDER_COUNT, TOTAL_SALES, AVG_ORDER_VALUE)
+    SELECT DATE(ORDER_DATE), COUNT(*), COALESCE(SUM(TOTAL_AMOUNT), 0), COALESCE(AVG(TOTAL_AMOUNT), 0)
+    FROM CYEAE_ORDERS
+    WHERE NOT EXISTS (SELECT 1 FROM CYEAE_DAILY_SALES)
+    GROUP BY DATE(ORDER_DATE);
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CYEAE_CUSTOMER_STATS (
+        CUSTOMER_ID INTEGER PRIMARY KEY,
+        ORDER_COUNT INTEGER NOT NULL DEFAULT 0,
+        TOTAL_SPENT DECIMAL(14,2) NOT NULL DEFAULT 0,
+        FIRST_ORDER_DATE TIMESTAMP,
+        LAST_ORDER_DATE TIMESTAMP,
+        FOREIGN KEY (CUSTOMER_ID) REFERENCES CYEAE_CUSTOMER(CUSTOMER_ID)
+    );
+    CREATE INDEX IF NOT EXISTS idx_customer_stats_spent ON CYEAE_CUSTOMER_STATS(TOTAL_SPENT DESC);
+    INSERT INTO CYEAE_CUSTOMER_STATS (CUSTOMER_ID, ORDER_COUNT, TOTAL_SPENT, FIRST_ORDER_DATE, LAST_ORDER_DATE)
+    SELECT CUSTOMER_ID, COUNT(*), COALESCE(SUM(TOTAL_AMOUNT), 0), MIN(ORDER_DATE), MAX(ORDER_DATE)
+    FROM CYEAE_ORDERS
+    WHERE CUSTOMER_ID IS NOT NULL AND NOT EXISTS (SELECT 1 FROM CYEAE_CUSTOMER_STATS)
+    GROUP BY CUSTOMER_ID;
+    """,
+    # Expression indexes matching the UPPER(NAME) = UPPER(?) lookups on the checkout path
+    """
+    CREATE INDEX IF NOT EXISTS idx_customer_upper_name_type ON CYEAE_CUSTOMER(UPPER(NAME), CUSTOMER_TYPE);
+    CREATE INDEX IF NOT EXISTS idx_customer_upper_name_email ON CYEAE_CUSTOMER(UPPER(NAME), EMAIL);
+    CREATE INDEX IF NOT EXISTS idx_customer_upper_name_phone ON CYEAE_CUSTOMER(UPPER(NAME), PHONE);
+    """,
+    # Bumped once per order write transaction (see _update_rollups) and by customer/order/line edits
+    """
+    CREATE TABLE IF NOT EXISTS CYEAE_DATA_VERSION (
+        ID INTEGER PRIMARY KEY CHECK (ID = 1),
+        VERSION INTEGER NOT NULL DEFAULT 0
+    );
+    INSERT OR IGNORE INTO CYEAE_DATA_VERSION (ID, VERSION) VALUES (1, 0);
+    """ + "".join(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table.lower()}_{event.lower()}_data_version
+    AFTER {event} ON CYEAE_{table}
+    BEGIN
+        UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+    END;
+    """ for table, events in (('CUSTOMER', ('INSERT', 'UPDATE', 'DELETE')), ('ORDERS', ('UPDATE', 'DELETE')),
+                               ('ORDER_ITEMS', ('UPDATE', 'DELETE')))
+            for event in events),
+]
+
+def encode_order_cursor(order_date, order_id):
+    """Opaque keyset cursor for the (ORDER_DATE, ORDER_ID) position of an order."""
+    raw = f"{order_date}|{order_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_order_cursor(cursor):
+    try:
+        order_date, order_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        return order_date, int(order_id)
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid order cursor')
+
+class PooledConnection:
+    """Proxy for a pooled sqlite3 connection; close() hands it back to the pool.
+
+    A proxy that is garbage-collected without close() still returns its
+    connection, so a missed close cannot leak a pool slot for good.
+    """
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._release = weakref.finalize(self, pool.release, conn)
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._conn.__exit__(exc_type, exc, tb)
+
+    def close(self):
+        if self._conn is None:
+            return
+        self._conn = None
+        self._release()
+
+class ConnectionPool:
+    """Bounded pool of pre-tuned connections shared by all threads."""
+    def __init__(self, factory, max_size=8, timeout=30.0):
+        self._factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._opened = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._high_water = 0
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        with self._cond:
+            while not self._idle and self._opened >= self.max_size:
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._opened >= self.max_size:
+                        elapsed = time.perf_counter() - start
+                        self._wait_timeouts += 1
+                        self._wait_time += elapsed
+                        self._max_wait_time = max(self._max_wait_time, elapsed)
+                        raise sqlite3.OperationalError('connection pool exhausted')
+            conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                self._opened += 1
+            self._in_use += 1
+            self._checkouts += 1
+            self._high_water = max(self._high_water, self._in_use)
+            if waited:
+                elapsed = time.perf_counter() - start
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait_time = max(self._max_wait_time, elapsed)
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._opened -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # A broken connection is dropped instead of being reused
+            conn.close()
+            conn = None
+        with self._cond:
+            self._in_use -= 1
+            if conn is None:
+                self._opened -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._opened -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open_connections': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_timeouts': self._wait_timeouts,
+                'total_wait_time': self._wait_time,
+                'max_wait_time': self._max_wait_time,
+                # Averaged over checkouts that had to wait, including ones that timed out
+                'avg_wait_time': (self._wait_time / (self._waits + self._wait_timeouts)
+                                  if self._waits + self._wait_timeouts else 0.0),
+                'high_water_mark': self._high_water
+            }
+
+class CatalogCache:
+    """Serialized catalog payloads keyed by name, invalidated by CYEAE_CATALOG_VERSION.
+
+    The version row is re-read at most once per check_interval seconds, so
+    repeat requests inside that window do no database work at all.
+    """
+    def __init__(self, db, check_interval=1.0):
+        self.db = db
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._entries = {}
+
+    def read_version(self):
+        return self.db.get_catalog_version()
+
+    def version(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._version is not None and now - self._checked_at < self.check_interval:
+                return self._version
+        version = self.read_version()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            self._checked_at = now
+        return version
+
+    def get(self, key, build):
+        """Return (payload, etag) for key, calling build() -> bytes/str only on a miss."""
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry[0] == version:
+            return entry[1], entry[2]
+        payload = build()
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        etag = f"{key}-{version}-{hashlib.sha1(payload).hexdigest()[:16]}"
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = (version, payload, etag)
+        return payload, etag
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def expire(self):
+        """Re-read the version on the next request instead of waiting out check_interval."""
+        with self._lock:
+            self._checked_at = 0.0
+
+class ReportCache(CatalogCache):
+    """Serialized report responses keyed by endpoint and query args.
+
+    Entries are invalidated by the (data, catalog) version pair, so unchanged
+    reports are served, or answered with 304, without running their queries.
+    At most max_entries are kept, least recently used first out.
+    """
+    def __init__(self, db, check_interval=1.0, max_entries=256):
+        super().__init__(db, check_interval)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def read_version(self):
+        return self.db.get_data_version()
+
+    def get(self, key, build):
+        """Return (payload, etag, last_modified) for key, calling build() only on a miss."""
+        version = self.version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[1], entry[2], entry[3]
+            self._misses += 1
+        payload = build()
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        etag = "{}-{}".format('.'.join(map(str, version)), hashlib.sha1(payload).hexdigest()[:16])
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            if self._version == version:
+                self._entries[key] = (version, payload, etag, last_modified)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return payload, etag, last_modified
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'version': list(self._version) if self._version else None
+            }
+
+class TTLCache:
+    """Payloads kept for ttl seconds and shared across requests.
+
+    Concurrent misses on the same key are collapsed: one caller builds while
+    the others wait for its result, so N viewers cost one query per ttl.
+    """
+    def __init__(self, ttl=2.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._building = {}
+
+    def get(self, key, build):
+        """Return (value, built_at) for key, calling build() only when the entry is stale"""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and time.monotonic() - entry[1] < self.ttl:
+                    return entry[0], entry[2]
+                pending = self._building.get(key)
+                if pending is None:
+                    pending = self._building[key] = threading.Event()
+                    break
+            pending.wait()
+        try:
+            value = build()
+            with self._lock:
+                self._entries[key] = (value, time.monotonic(), time.time())
+                return value, self._entries[key][2]
+        finally:
+            with self._lock:
+                self._building.pop(key).set()
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+class OrderFeed:
+    """In-process broadcast hub of newly committed orders, keyed by ORDER_ID.
+
+    Writers call publish() after each commit, which only marks the feed
+    dirty. The first subscriber to wake loads the new orders once and every
+    subscriber reads them from a shared ring buffer; readers that fall behind
+    the buffer (or reconnect with an old Last-Event-ID) are replayed from the
+    database. Commits made by other processes appear on the next publish.
+    """
+    def __init__(self, load, latest, buffer_size=500):
+        self.load = load
+        self.latest = latest
+        self.buffer_size = buffer_size
+        self._cond = threading.Condition()
+        self._events = deque()
+        self._floor = None
+        self._last_id = None
+        self._pending = False
+        self._fetching = False
+
+    def publish(self):
+        with self._cond:
+            self._pending = True
+            self._cond.notify_all()
+
+    def position(self):
+        """ORDER_ID of the newest committed order; a new subscriber starts after it."""
+        return self.latest()
+
+    def _fetch(self):
+        # Called with the lock held; the query itself runs without it
+        since = self._last_id
+        self._pending = False
+        self._fetching = True
+        self._cond.release()
+        try:
+            events = self.load(since, self.buffer_size)
+        except Exception:
+            self._cond.acquire()
+            self._pending = True
+            self._fetching = False
+            self._cond.notify_all()
+            raise
+        self._cond.acquire()
+        self._fetching = False
+        if len(events) == self.buffer_size:
+            self._pending = True
+        for event in events:
+            if len(self._events) == self.buffer_size:
+                self._floor = self._events.popleft()[0]
+            self._events.append(event)
+        if events:
+            self._last_id = events[-1][0]
+        self._cond.notify_all()
+
+    def read(self, after_id, timeout=15.0):
+        """Return [(order_id, order), ...] with order_id > after_id, waiting up to timeout for new ones."""
+        deadline = time.monotonic() + timeout
+        if self._last_id is None:
+            # Query outside the lock so readers and publish() never wait on it
+            latest = self.latest()
+            with self._cond:
+                if self._last_id is None:
+                    self._last_id = self._floor = latest
+        with self._cond:
+            while True:
+                if self._pending and not self._fetching:
+                    self._fetch()
+                if after_id < self._floor:
+                    break
+                if after_id < self._last_id:
+                    return [event for event in self._events if event[0] > after_id]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._cond.wait(remaining)
+        return self.load(after_id, self.buffer_size)
+
+class OrderWriter:
+    """Single writer thread that drains queued order writes in group-committed batches.
+
+    A batch is flushed after max_batch jobs or flush_interval_ms, whichever comes
+    first. Each job runs inside its own SAVEPOINT so a failing order only fails
+    its own Future; the rest of the batch commits with one fsync.
+    """
+    def __init__(self, db_manager, max_batch=64, flush_interval_ms=5, on_commit=None,
+                 result_timeout=60.0):
+        self.db_manager = db_manager
+        self.on_commit = on_commit
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.result_timeout = result_timeout
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._jobs = 0
+        self._largest_batch = 0
+        self._failed_batches = 0
+        self._commit_hook_errors = 0
+        self._thread = threading.Thread(target=self._run, name='order-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((fn, args, future))
+        return future
+
+    def write(self, fn, *args):
+        """Submit fn and wait for its result, at most result_timeout seconds"""
+        future = self.submit(fn, *args)
+        try:
+            return future.result(timeout=self.result_timeout)
+        except FutureTimeoutError:
+            # Drop the job if it has not started; a running batch still completes
+            future.cancel()
+            raise sqlite3.OperationalError('order writer did not respond in time')
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            batch = [job]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stopping = True
+                    break
+                batch.append(job)
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # Never let one batch kill the thread and strand every later caller
+                self._fail(batch, e)
+            if stopping:
+                return
+
+    def _fail(self, batch, error):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        with self._stats_lock:
+            self._failed_batches += 1
+
+    def _flush(self, batch):
+        batch = [job for job in batch if job[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        results = []
+        conn = None
+        try:
+            conn = self.db_manager.get_connection()
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            for fn, args, future in batch:
+                cursor.execute("SAVEPOINT order_write")
+                try:
+                    results.append((future, fn(cursor, *args)))
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO order_write")
+                    future.set_exception(e)
+                finally:
+                    cursor.execute("RELEASE order_write")
+            conn.commit()
+        except Exception as e:
+            # Closing the connection below rolls back whatever was not committed
+            self._fail(batch, e)
+            return
+        finally:
+            if conn is not None:
+                conn.close()
+            with self._stats_lock:
+                self._batches += 1
+                self._jobs += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+        for future, result in results:
+            future.set_result(result)
+        if results and self.on_commit is not None:
+            # The orders are already committed; a failing hook must not fail them
+            try:
+                self.on_commit()
+            except Exception:
+                with self._stats_lock:
+                    self._commit_hook_errors += 1
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'batches': self._batches,
+                'orders': self._jobs,
+                'avg_batch_size': self._jobs / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'failed_batches': self._failed_batches,
+                'commit_hook_errors': self._commit_hook_errors,
+                'queued': self._queue.qsize()
+            }
 
 class DatabaseManager:
-    def __init__(self, db_path='coffee_shop.db'):
+    def __init__(self, db_path='coffee_shop.db', pool_size=8, busy_timeout_ms=5000,
+                 mmap_size=64 * 1024 * 1024, cache_size_kb=16 * 1024):
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cache_size_kb = cache_size_kb
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+        self.pool = ConnectionPool(self._open_connection, max_size=pool_size)
+    def _open_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        # Negative cache_size is interpreted by SQLite as KiB rather than pages
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        if not self._schema_ready:
+            with self._schema_lock:
+                if not self._schema_ready:
+                    self.ensure_schema(conn)
+                    self._schema_ready = True
+        return conn
+    def ensure_schema(self, conn):
+        for script in SCHEMA_SCRIPTS:
+            conn.executescript(script)
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return PooledConnection(self.pool, self.pool.acquire())
+    def pool_stats(self):
+        return self.pool.stats()
+    def close_pool(self):
+        self.pool.close_all()
     def hash_password(self, password):
         return hashlib.sha256(password.encode()).hexdigest()
     def verify_password(self, password, hash_value):
         return self.hash_password(password) == hash_value
 
 class CoffeeShopDB:
-    def __init__(self):
-        self.db_manager = DatabaseManager()
+    def __init__(self, db_path='coffee_shop.db'):
+        self.db_manager = DatabaseManager(db_path)
+        self.order_writer = None
+        self.order_feed = OrderFeed(self.get_orders_after, self.get_latest_order_id)
     
     def get_all_products(self):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT p.PRODUCT_ID, p.NAME, p.PRICE, p.IS_ACTIVE, c.CATEGORY_NAME
-            FROM CYEAE_PRODUCT p
-            LEFT JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
-            WHERE p.IS_ACTIVE = 'Y'
-            ORDER BY c.CATEGORY_NAME, p.NAME
-        """)
-        products = cursor.fetchall()
-        conn.close()
-        return products
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT p.PRODUCT_ID, p.NAME, p.PRICE, p.IS_ACTIVE, c.CATEGORY_NAME
+                FROM CYEAE_PRODUCT p
+                LEFT JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
+                WHERE p.IS_ACTIVE = 'Y'
+                ORDER BY c.CATEGORY_NAME, p.NAME
+            """)
+            products = cursor.fetchall()
+            return products
+        finally:
+            conn.close()
     
     def get_categories(self):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT CATEGORY_ID, CATEGORY_NAME, DESCRIPTION FROM CYEAE_CATEGORY ORDER BY CATEGORY_NAME")
-        categories = cursor.fetchall()
-        conn.close()
-        return categories
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT CATEGORY_ID, CATEGORY_NAME, DESCRIPTION FROM CYEAE_CATEGORY ORDER BY CATEGORY_NAME")
+            categories = cursor.fetchall()
+            return categories
+        finally:
+            conn.close()
     
-    def create_customer(self, name, phone, email, address, customer_type='regular'):
+    def get_catalog_version(self):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT VERSION FROM CYEAE_CATALOG_VERSION WHERE ID = 1")
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    def get_data_version(self):
+        """(order data version, catalog version); any report built from either changes with it"""
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT d.VERSION, c.VERSION
+                FROM CYEAE_DATA_VERSION d, CYEAE_CATALOG_VERSION c
+                WHERE d.ID = 1 AND c.ID = 1
+            """)
+            row = cursor.fetchone()
+            return tuple(row) if row else (0, 0)
+        finally:
+            conn.close()
+    
+    def _insert_customer(self, cursor, name, phone, email, address, customer_type='regular'):
         cursor.execute("""
             INSERT INTO CYEAE_CUSTOMER (NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE)
             VALUES (?, ?, ?, ?, ?)
         """, (name, phone, email, address, customer_type))
-        customer_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return customer_id
+        return cursor.lastrowid
+
+    def create_customer(self, name, phone, email, address, customer_type='regular'):
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            customer_id = self._insert_customer(cursor, name, phone, email, address, customer_type)
+            conn.commit()
+            return customer_id
+        finally:
+            conn.close()
 
     def create_member_customer(self, customer_id, password, date_of_birth=None):
         conn = self.db_manager.get_connection()
@@ -68,20 +700,22 @@ class CoffeeShopDB:
 
     def get_member_by_email(self, email):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            SELECT c.CUSTOMER_ID, c.NAME, c.PHONE, c.EMAIL, c.ADDRESS, c.CUSTOMER_TYPE,
-                   m.PASSWORD_HASH, m.DATE_OF_BIRTH, m.REGISTRATION_DATE
-            FROM CYEAE_CUSTOMER c
-            JOIN CYEAE_MEMBER_CUSTOMERS m ON c.CUSTOMER_ID = m.CUSTOMER_ID
-            WHERE c.EMAIL = ?
-            """,
-            (email,)
-        )
-        row = cursor.fetchone()
-        conn.close()
-        return row
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT c.CUSTOMER_ID, c.NAME, c.PHONE, c.EMAIL, c.ADDRESS, c.CUSTOMER_TYPE,
+                       m.PASSWORD_HASH, m.DATE_OF_BIRTH, m.REGISTRATION_DATE
+                FROM CYEAE_CUSTOMER c
+                JOIN CYEAE_MEMBER_CUSTOMERS m ON c.CUSTOMER_ID = m.CUSTOMER_ID
+                WHERE c.EMAIL = ?
+                """,
+                (email,)
+            )
+            row = cursor.fetchone()
+            return row
+        finally:
+            conn.close()
 
     def verify_member_login(self, email, password):
         member = self.get_member_by_email(email)
@@ -101,36 +735,164 @@ class CoffeeShopDB:
             }
         return None
     
-    def create_order(self, customer_id, payment_method, order_items):
+    def _fetch_prices(self, cursor, product_ids):
+        product_ids = sorted(set(product_ids))
+        if not product_ids:
+            return {}
+        placeholders = ','.join('?' * len(product_ids))
+        cursor.execute(
+            f"SELECT PRODUCT_ID, PRICE FROM CYEAE_PRODUCT WHERE PRODUCT_ID IN ({placeholders})",
+            product_ids
+        )
+        prices = dict(cursor.fetchall())
+        missing = [pid for pid in product_ids if pid not in prices]
+        if missing:
+            raise ValueError(f"Unknown product ID(s): {', '.join(str(pid) for pid in missing)}")
+        return prices
+
+    def _insert_orders(self, cursor, orders):
+        """Insert (customer_id, payment_method, order_items, order_date) tuples on an open cursor."""
+        prices = self._fetch_prices(
+            cursor, (int(item['product_id']) for _, _, items, _ in orders for item in items)
+        )
+        order_ids = []
+        line_rows = []
+        for customer_id, payment_method, order_items, order_date in orders:
+            lines = []
+            for item in order_items:
+                unit_price = prices[int(item['product_id'])]
+                lines.append((int(item['product_id']), item['quantity'], unit_price, unit_price * item['quantity']))
+            total_amount = sum(line[3] for line in lines)
+
+            cursor.execute("""
+                INSERT INTO CYEAE_ORDERS (CUSTOMER_ID, PAYMENT_METHOD, TOTAL_AMOUNT, ORDER_DATE)
+                VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+            """, (customer_id, payment_method, total_amount, order_date))
+            order_id = cursor.lastrowid
+            order_ids.append(order_id)
+            line_rows.extend((order_id,) + line for line in lines)
+
+        cursor.executemany("""
+            INSERT INTO CYEAE_ORDER_ITEMS (ORDER_ID, PRODUCT_ID, QUANTITY, UNIT_PRICE, LINE_AMOUNT)
+            VALUES (?, ?, ?, ?, ?)
+        """, line_rows)
+        if order_ids:
+            self._update_rollups(cursor, order_ids[0], order_ids[-1])
+        return order_ids
+
+    def _update_rollups(self, cursor, first_order_id, last_order_id):
+        # Orders inserted in one write transaction have contiguous ORDER_IDs
+        cursor.execute("UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1")
+        cursor.execute("""
+            INSERT INTO CYEAE_DAILY_SALES (SALES_DATE, ORDER_COUNT, TOTAL_SALES, AVG_ORDER_VALUE)
+            SELECT DATE(ORDER_DATE), COUNT(*), SUM(TOTAL_AMOUNT), AVG(TOTAL_AMOUNT)
+            FROM CYEAE_ORDERS
+            WHERE ORDER_ID BETWEEN ? AND ?
+            GROUP BY DATE(ORDER_DATE)
+            ON CONFLICT(SALES_DATE) DO UPDATE SET
+                ORDER_COUNT = ORDER_COUNT + excluded.ORDER_COUNT,
+                TOTAL_SALES = TOTAL_SALES + excluded.TOTAL_SALES,
+                AVG_ORDER_VALUE = CAST(TOTAL_SALES + excluded.TOTAL_SALES AS REAL) / (ORDER_COUNT + excluded.ORDER_COUNT)
+        """, (first_order_id, last_order_id))
+        cursor.execute("""
+            INSERT INTO CYEAE_CUSTOMER_STATS (CUSTOMER_ID, ORDER_COUNT, TOTAL_SPENT, FIRST_ORDER_DATE, LAST_ORDER_DATE)
+            SELECT CUSTOMER_ID, COUNT(*), SUM(TOTAL_AMOUNT), MIN(ORDER_DATE), MAX(ORDER_DATE)
+            FROM CYEAE_ORDERS
+            WHERE ORDER_ID BETWEEN ? AND ? AND CUSTOMER_ID IS NOT NULL
+            GROUP BY CUSTOMER_ID
+            ON CONFLICT(CUSTOMER_ID) DO UPDATE SET
+                ORDER_COUNT = ORDER_COUNT + excluded.ORDER_COUNT,
+                TOTAL_SPENT = TOTAL_SPENT + excluded.TOTAL_SPENT,
+                FIRST_ORDER_DATE = MIN(COALESCE(FIRST_ORDER_DATE, excluded.FIRST_ORDER_DATE), excluded.FIRST_ORDER_DATE),
+                LAST_ORDER_DATE = MAX(COALESCE(LAST_ORDER_DATE, excluded.LAST_ORDER_DATE), excluded.LAST_ORDER_DATE)
+        """, (first_order_id, last_order_id))
+
+    def rebuild_rollups(self):
+        """Recompute rollup tables from CYEAE_ORDERS, e.g. after backfills or manual edits."""
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
         
         try:
-            total_amount = 0
-            for item in order_items:
-                cursor.execute("SELECT PRICE FROM CYEAE_PRODUCT WHERE PRODUCT_ID = ?", (item['product_id'],))
-                price = cursor.fetchone()[0]
-                total_amount += price * item['quantity']
-            
+            cursor.execute("UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1")
+            cursor.execute("DELETE FROM CYEAE_DAILY_SALES")
             cursor.execute("""
-                INSERT INTO CYEAE_ORDERS (CUSTOMER_ID, PAYMENT_METHOD, TOTAL_AMOUNT)
-                VALUES (?, ?, ?)
-            """, (customer_id, payment_method, total_amount))
-            
-            order_id = cursor.lastrowid
-            
-            for item in order_items:
-                cursor.execute("SELECT PRICE FROM CYEAE_PRODUCT WHERE PRODUCT_ID = ?", (item['product_id'],))
-                unit_price = cursor.fetchone()[0]
-                line_amount = unit_price * item['quantity']
-                
-                cursor.execute("""
-                    INSERT INTO CYEAE_ORDER_ITEMS (ORDER_ID, PRODUCT_ID, QUANTITY, UNIT_PRICE, LINE_AMOUNT)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (order_id, item['product_id'], item['quantity'], unit_price, line_amount))
+                INSERT INTO CYEAE_DAILY_SALES (SALES_DATE, ORDER_COUNT, TOTAL_SALES, AVG_ORDER_VALUE)
+                SELECT DATE(ORDER_DATE), COUNT(*), COALESCE(SUM(TOTAL_AMOUNT), 0), COALESCE(AVG(TOTAL_AMOUNT), 0)
+                FROM CYEAE_ORDERS
+                GROUP BY DATE(ORDER_DATE)
+            """)
+            cursor.execute("DELETE FROM CYEAE_CUSTOMER_STATS")
+            cursor.execute("""
+                INSERT INTO CYEAE_CUSTOMER_STATS (CUSTOMER_ID, ORDER_COUNT, TOTAL_SPENT, FIRST_ORDER_DATE, LAST_ORDER_DATE)
+                SELECT CUSTOMER_ID, COUNT(*), COALESCE(SUM(TOTAL_AMOUNT), 0), MIN(ORDER_DATE), MAX(ORDER_DATE)
+                FROM CYEAE_ORDERS
+                WHERE CUSTOMER_ID IS NOT NULL
+                GROUP BY CUSTOMER_ID
+            """)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def _write(self, fn, *args):
+        """Run fn(cursor, *args) in its own write transaction, or via the group-commit writer."""
+        if self.order_writer is not None:
+            return self.order_writer.write(fn, *args)
+
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            result = fn(cursor, *args)
+            conn.commit()
+            self.order_feed.publish()
+            return result
             
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            conn.close()
+
+    def enable_write_behind(self, max_batch=64, flush_interval_ms=5):
+        """Route create_order/place_order through one writer thread that group-commits them."""
+        if self.order_writer is None:
+            self.order_writer = OrderWriter(self.db_manager, max_batch, flush_interval_ms,
+                                            on_commit=self.order_feed.publish)
+        return self.order_writer
+
+    def disable_write_behind(self):
+        writer, self.order_writer = self.order_writer, None
+        if writer is not None:
+            writer.stop()
+
+    def _create_order(self, cursor, customer_id, payment_method, order_items):
+        return self._insert_orders(cursor, [(customer_id, payment_method, order_items, None)])[0]
+
+    def create_order(self, customer_id, payment_method, order_items):
+        return self._write(self._create_order, customer_id, payment_method, order_items)
+
+    def create_orders(self, batch):
+        """Insert many orders in one transaction.
+
+        Each entry is a dict with customer_id, payment_method, items and an
+        optional order_date ('YYYY-MM-DD HH:MM:SS'). Returns the new ORDER_IDs
+        in batch order; nothing is written if any order fails.
+        """
+        conn = self.db_manager.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            order_ids = self._insert_orders(cursor, [
+                (order['customer_id'], order['payment_method'], order['items'], order.get('order_date'))
+                for order in batch
+            ])
             conn.commit()
-            return order_id
+            self.order_feed.publish()
+            return order_ids
             
         except Exception as e:
             conn.rollback()
@@ -138,187 +900,443 @@ class CoffeeShopDB:
         finally:
             conn.close()
     
-    def get_order_history(self, customer_id=None):
+    def _order_history_query(self, customer_id=None, position=None, limit=None):
+        query = """
+            SELECT o.ORDER_ID, c.NAME, o.ORDER_DATE, o.PAYMENT_METHOD, o.TOTAL_AMOUNT
+            FROM CYEAE_ORDERS o
+            JOIN CYEAE_CUSTOMER c ON o.CUSTOMER_ID = c.CUSTOMER_ID
+            WHERE 1=1
+        """
+        params = []
+        if customer_id:
+            query += " AND o.CUSTOMER_ID = ?"
+            params.append(customer_id)
+        if position:
+            query += " AND (o.ORDER_DATE, o.ORDER_ID) < (?, ?)"
+            params.extend(position)
+        query += " ORDER BY o.ORDER_DATE DESC, o.ORDER_ID DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return query, params
+
+    def _default_payment_method(self, cursor, customer_id):
+        cursor.execute("""
+            SELECT PREFERENCE_VALUE
+            FROM CYEAE_MEMBER_PREFERENCES
+            WHERE CUSTOMER_ID = ? AND PREFERENCE_TYPE = 'default_pay'
+            ORDER BY CREATED_DATE DESC
+            LIMIT 1
+        """, (customer_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _place_order(self, cursor, order_items, customer_id, customer_name, customer_email,
+                     customer_phone, customer_address, payment_method, force_regular):
+        if not customer_id:
+            if customer_email or customer_phone:
+                existing_customer = self._find_customer(cursor, customer_name, customer_email or None)
+                if existing_customer:
+                    customer_id = existing_customer[0]
+            elif self._find_potential_members(cursor, customer_name) and not force_regular:
+                raise VerificationRequired(
+                    f'Found potential member(s) with name "{customer_name}". '
+                    'Please provide email or phone for verification.'
+                )
+            if not customer_id:
+                customer_id = self._insert_customer(cursor, customer_name, customer_phone,
+                                                    customer_email, customer_address)
+
+        if not payment_method:
+            payment_method = self._default_payment_method(cursor, customer_id) or 'cash'
+
+        order_id = self._insert_orders(cursor, [(customer_id, payment_method, order_items, None)])[0]
+        return order_id, customer_id
+
+    def place_order(self, order_items, customer_id=None, customer_name=None, customer_email='',
+                    customer_phone='', customer_address='', payment_method=None, force_regular=False):
+        """Resolve the customer, default payment and insert the order in one transaction.
+
+        Guests are matched by name and email, or created as regular customers.
+        A name-only guest who matches a member raises VerificationRequired unless
+        force_regular is set. Returns (order_id, customer_id).
+        """
+        return self._write(self._place_order, order_items, customer_id, customer_name, customer_email,
+                           customer_phone, customer_address, payment_method, force_regular)
+
+    def get_order_history(self, customer_id=None, limit=None, after=None):
+        """Orders newest first; limit/after page through them by (ORDER_DATE, ORDER_ID) keyset."""
+        # An invalid cursor raises ValueError before a pooled connection is taken
+        position = decode_order_cursor(after) if after else None
+        return self._order_history_page(customer_id, position, limit)
+
+    def _order_history_page(self, customer_id, position, limit):
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+        
+            cursor.execute(*self._order_history_query(customer_id, position, limit))
+        
+            orders = cursor.fetchall()
+            return orders
+        finally:
+            conn.close()
+
+    def iter_order_history(self, customer_id=None, after=None, batch_size=500):
+        """Iterate order rows newest first without materializing the full result.
+
+        Rows are read in keyset pages of batch_size, each on its own pooled
+        connection, so a slow consumer never pins a connection or a read
+        transaction. The cursor is validated here, before iteration starts.
+        """
+        position = decode_order_cursor(after) if after else None
+        return self._iter_order_pages(customer_id, position, batch_size)
+
+    def _iter_order_pages(self, customer_id, position, batch_size):
+        while True:
+            rows = self._order_history_page(customer_id, position, batch_size)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1][2], rows[-1][0])
+    
+    def get_latest_order_id(self):
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+        
+            cursor.execute("SELECT COALESCE(MAX(ORDER_ID), 0) FROM CYEAE_ORDERS")
+        
+            latest = cursor.fetchone()[0]
+            return latest
+        finally:
+            conn.close()
+
+    def get_orders_after(self, after_id, limit=500):
+        """Up to limit orders with ORDER_ID > after_id, oldest first, as (order_id, order) with line items."""
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
         
-        if customer_id:
-            cursor.execute("""
-                SELECT o.ORDER_ID, c.NAME, o.ORDER_DATE, o.PAYMENT_METHOD, o.TOTAL_AMOUNT
-                FROM CYEAE_ORDERS o
-                JOIN CYEAE_CUSTOMER c ON o.CUSTOMER_ID = c.CUSTOMER_ID
-                WHERE o.CUSTOMER_ID = ?
-                ORDER BY o.ORDER_DATE DESC
-            """, (customer_id,))
-        else:
+        try:
+            cursor.execute("BEGIN")
             cursor.execute("""
                 SELECT o.ORDER_ID, c.NAME, o.ORDER_DATE, o.PAYMENT_METHOD, o.TOTAL_AMOUNT
                 FROM CYEAE_ORDERS o
-                JOIN CYEAE_CUSTOMER c ON o.CUSTOMER_ID = c.CUSTOMER_ID
-                ORDER BY o.ORDER_DATE DESC
-            """)
-        
-        orders = cursor.fetchall()
-        conn.close()
-        return orders
-    
+                LEFT JOIN CYEAE_CUSTOMER c ON o.CUSTOMER_ID = c.CUSTOMER_ID
+                WHERE o.ORDER_ID > ?
+                ORDER BY o.ORDER_ID
+                LIMIT ?
+            """, (after_id, int(limit)))
+            orders = {}
+            for order_id, customer_name, order_date, payment_method, total_amount in cursor.fetchall():
+                orders[order_id] = {
+                    'order_id': order_id,
+                    'customer_name': customer_name,
+                    'order_date': order_date,
+                    'payment_method': payment_method,
+                    'total_amount': float(total_amount or 0),
+                    'items': []
+                }
+            if orders:
+                cursor.execute("""
+                    SELECT oi.ORDER_ID, oi.PRODUCT_ID, p.NAME, oi.QUANTITY, oi.UNIT_PRICE, oi.LINE_AMOUNT
+                    FROM CYEAE_ORDER_ITEMS oi
+                    JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
+                    WHERE oi.ORDER_ID BETWEEN ? AND ?
+                    ORDER BY oi.ORDER_ITEM_ID
+                """, (min(orders), max(orders)))
+                for order_id, product_id, name, quantity, unit_price, line_amount in cursor.fetchall():
+                    if order_id in orders:
+                        orders[order_id]['items'].append({
+                            'product_id': product_id,
+                            'product_name': name,
+                            'quantity': quantity,
+                            'unit_price': float(unit_price),
+                            'line_amount': float(line_amount)
+                        })
+            return list(orders.items())
+        finally:
+            conn.rollback()
+            conn.close()
+
     def get_order_details(self, order_id):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT oi.PRODUCT_ID, p.NAME, oi.QUANTITY, oi.UNIT_PRICE, oi.LINE_AMOUNT
-            FROM CYEAE_ORDER_ITEMS oi
-            JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
-            WHERE oi.ORDER_ID = ?
-        """, (order_id,))
+            cursor.execute("""
+                SELECT oi.PRODUCT_ID, p.NAME, oi.QUANTITY, oi.UNIT_PRICE, oi.LINE_AMOUNT
+                FROM CYEAE_ORDER_ITEMS oi
+                JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
+                WHERE oi.ORDER_ID = ?
+            """, (order_id,))
         
-        items = cursor.fetchall()
-        conn.close()
-        return items
+            items = cursor.fetchall()
+            return items
+        finally:
+            conn.close()
     
-    def get_sales_report(self, start_date=None, end_date=None):
+    def get_sales_report(self, start_date=None, end_date=None, store=None):
+        """Daily sales rows, from CYEAE_DAILY_SALES or an analytics store snapshot if given"""
+        if store is not None:
+            return store.daily_sales(start_date, end_date)
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        base_query = """
-            SELECT 
-                DATE(o.ORDER_DATE) as order_date,
-                COUNT(o.ORDER_ID) as order_count,
-                SUM(o.TOTAL_AMOUNT) as total_sales,
-                AVG(o.TOTAL_AMOUNT) as avg_order_value
-            FROM CYEAE_ORDERS o
-            WHERE 1=1
-        """
+            base_query = """
+                SELECT 
+                    SALES_DATE as order_date,
+                    ORDER_COUNT as order_count,
+                    TOTAL_SALES as total_sales,
+                    AVG_ORDER_VALUE as avg_order_value
+                FROM CYEAE_DAILY_SALES
+                WHERE ORDER_COUNT > 0
+            """
         
-        params = []
-        if start_date:
-            base_query += " AND DATE(o.ORDER_DATE) >= ?"
-            params.append(start_date)
-        if end_date:
-            base_query += " AND DATE(o.ORDER_DATE) <= ?"
-            params.append(end_date)
+            params = []
+            if start_date:
+                base_query += " AND SALES_DATE >= ?"
+                params.append(start_date)
+            if end_date:
+                base_query += " AND SALES_DATE <= ?"
+                params.append(end_date)
             
-        base_query += " GROUP BY DATE(o.ORDER_DATE) ORDER BY order_date DESC"
+            base_query += " ORDER BY SALES_DATE DESC"
         
-        cursor.execute(base_query, params)
-        report = cursor.fetchall()
-        conn.close()
-        return report
+            cursor.execute(base_query, params)
+            report = cursor.fetchall()
+            return report
+        finally:
+            conn.close()
     
-    def get_product_sales_report(self):
+    def get_product_sales_report(self, store=None):
+        """Per-product sales; with an analytics store snapshot only names come from SQLite"""
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT 
-                p.NAME as product_name,
-                c.CATEGORY_NAME,
-                SUM(oi.QUANTITY) as total_quantity,
-                SUM(oi.LINE_AMOUNT) as total_revenue,
-                COUNT(DISTINCT oi.ORDER_ID) as order_count
-            FROM CYEAE_ORDER_ITEMS oi
-            JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
-            JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
-            GROUP BY p.PRODUCT_ID, p.NAME, c.CATEGORY_NAME
-            ORDER BY total_revenue DESC
-        """)
+        try:
+            cursor = conn.cursor()
+            if store is not None:
+                totals = store.product_sales()
+                cursor.execute("""
+                    SELECT p.PRODUCT_ID, p.NAME, c.CATEGORY_NAME
+                    FROM CYEAE_PRODUCT p
+                    JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
+                """)
+                report = [(name, category_name) + totals[product_id]
+                          for product_id, name, category_name in cursor.fetchall()
+                          if product_id in totals]
+                report.sort(key=lambda row: row[3], reverse=True)
+                return report
         
-        report = cursor.fetchall()
-        conn.close()
-        return report
+            cursor.execute("""
+                SELECT 
+                    p.NAME as product_name,
+                    c.CATEGORY_NAME,
+                    SUM(oi.QUANTITY) as total_quantity,
+                    SUM(oi.LINE_AMOUNT) as total_revenue,
+                    COUNT(DISTINCT oi.ORDER_ID) as order_count
+                FROM CYEAE_ORDER_ITEMS oi
+                JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
+                JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
+                GROUP BY p.PRODUCT_ID, p.NAME, c.CATEGORY_NAME
+                ORDER BY total_revenue DESC
+            """)
+        
+            report = cursor.fetchall()
+            return report
+        finally:
+            conn.close()
     
-    def get_customer_report(self):
+    def get_customer_report(self, limit=None):
+        """Customers by total spend, read from CYEAE_CUSTOMER_STATS.
+
+        With a limit only the top-N spenders are returned (an index range scan);
+        without one, customers who have never ordered follow with zero counts.
+        """
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+        
+            query = """
+                SELECT 
+                    c.CUSTOMER_ID,
+                    c.NAME as customer_name,
+                    c.CUSTOMER_TYPE,
+                    s.ORDER_COUNT as order_count,
+                    s.TOTAL_SPENT as total_spent,
+                    CAST(s.TOTAL_SPENT AS REAL) / s.ORDER_COUNT as avg_order_value,
+                    s.LAST_ORDER_DATE as last_order_date
+                FROM CYEAE_CUSTOMER_STATS s
+                JOIN CYEAE_CUSTOMER c ON c.CUSTOMER_ID = s.CUSTOMER_ID
+                WHERE s.ORDER_COUNT > 0
+                ORDER BY s.TOTAL_SPENT DESC
+            """
+            params = []
+            if limit is not None:
+                query += " LIMIT ?"
+                params.append(int(limit))
+            cursor.execute(query, params)
+            report = cursor.fetchall()
+
+            if limit is None:
+                cursor.execute("""
+                    SELECT c.CUSTOMER_ID, c.NAME, c.CUSTOMER_TYPE, 0, NULL, NULL, NULL
+                    FROM CYEAE_CUSTOMER c
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM CYEAE_CUSTOMER_STATS s
+                        WHERE s.CUSTOMER_ID = c.CUSTOMER_ID AND s.ORDER_COUNT > 0
+                    )
+                    ORDER BY c.CUSTOMER_ID
+                """)
+                report.extend(cursor.fetchall())
+            return report
+        finally:
+            conn.close()
+
+    def get_dashboard(self, days=7, top_n=5):
+        """Headline KPIs, the last `days` daily totals and top customers from one read snapshot.
+
+        Everything comes from the rollup tables and their indexes, so the cost
+        does not grow with the number of orders.
+        """
         conn = self.db_manager.get_connection()
         cursor = conn.cursor()
+        try:
+            cursor.execute("BEGIN")
+            today = cursor.execute("SELECT DATE('now')").fetchone()[0]
+            cursor.execute("""
+                SELECT SALES_DATE, ORDER_COUNT, TOTAL_SALES, AVG_ORDER_VALUE
+                FROM CYEAE_DAILY_SALES
+                WHERE SALES_DATE >= DATE('now', ?)
+                ORDER BY SALES_DATE
+            """, (f'-{int(days) - 1} days',))
+            daily = {row[0]: row for row in cursor.fetchall()}
+            cursor.execute("SELECT COALESCE(SUM(ORDER_COUNT), 0), COALESCE(SUM(TOTAL_SALES), 0) FROM CYEAE_DAILY_SALES")
+            total_orders, total_sales = cursor.fetchone()
+            cursor.execute("SELECT COUNT(*) FROM CYEAE_CUSTOMER")
+            total_customers = cursor.fetchone()[0]
+            cursor.execute("""
+                SELECT c.CUSTOMER_ID, c.NAME, c.CUSTOMER_TYPE, s.ORDER_COUNT, s.TOTAL_SPENT, s.LAST_ORDER_DATE
+                FROM CYEAE_CUSTOMER_STATS s
+                JOIN CYEAE_CUSTOMER c ON c.CUSTOMER_ID = s.CUSTOMER_ID
+                WHERE s.ORDER_COUNT > 0
+                ORDER BY s.TOTAL_SPENT DESC
+                LIMIT ?
+            """, (int(top_n),))
+            top_customers = cursor.fetchall()
+        finally:
+            conn.rollback()
+            conn.close()
         
-        cursor.execute("""
-            SELECT 
-                c.CUSTOMER_ID,
-                c.NAME as customer_name,
-                c.CUSTOMER_TYPE,
-                COUNT(o.ORDER_ID) as order_count,
-                SUM(o.TOTAL_AMOUNT) as total_spent,
-                AVG(o.TOTAL_AMOUNT) as avg_order_value,
-                MAX(o.ORDER_DATE) as last_order_date
-            FROM CYEAE_CUSTOMER c
-            LEFT JOIN CYEAE_ORDERS o ON c.CUSTOMER_ID = o.CUSTOMER_ID
-            GROUP BY c.CUSTOMER_ID, c.NAME, c.CUSTOMER_TYPE
-            ORDER BY total_spent DESC
-        """)
+        # Days without orders have no rollup row; report them as zero
+        end = datetime.strptime(today, '%Y-%m-%d').date()
+        series = []
+        for offset in range(int(days) - 1, -1, -1):
+            day = (end - timedelta(days=offset)).isoformat()
+            _, order_count, sales, avg_value = daily.get(day, (day, 0, 0, 0))
+            series.append({'date': day, 'order_count': order_count,
+                           'total_sales': float(sales or 0), 'avg_order_value': float(avg_value or 0)})
         
-        report = cursor.fetchall()
-        conn.close()
-        return report
+        return {
+            'today': series[-1],
+            'yesterday': series[-2] if len(series) > 1 else None,
+            'daily_sales': series,
+            'total_orders': total_orders,
+            'total_sales': float(total_sales),
+            'total_customers': total_customers,
+            'top_customers': [
+                {'customer_id': row[0], 'customer_name': row[1], 'customer_type': row[2],
+                 'order_count': row[3], 'total_spent': float(row[4]), 'last_order_date': row[5]}
+                for row in top_customers
+            ],
+        }
     
-    def find_customer_by_name_and_email(self, name, email=None):
+    def get_customer_stats(self, customer_id):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        if email:
-            cursor.execute("""
-                SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
-                FROM CYEAE_CUSTOMER 
-                WHERE UPPER(NAME) = UPPER(?) AND EMAIL = ?
-                ORDER BY 
-                    CASE WHEN CUSTOMER_TYPE = 'member' THEN 1 ELSE 2 END,
-                    CUSTOMER_ID DESC
-                LIMIT 1
-            """, (name, email))
-        else:
             cursor.execute("""
-                SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
-                FROM CYEAE_CUSTOMER 
-                WHERE UPPER(NAME) = UPPER(?)
-                ORDER BY 
-                    CASE WHEN CUSTOMER_TYPE = 'member' THEN 1 ELSE 2 END,
-                    CUSTOMER_ID DESC
-                LIMIT 1
-            """, (name,))
+                SELECT ORDER_COUNT, TOTAL_SPENT, FIRST_ORDER_DATE, LAST_ORDER_DATE
+                FROM CYEAE_CUSTOMER_STATS
+                WHERE CUSTOMER_ID = ?
+            """, (customer_id,))
         
-        customer = cursor.fetchone()
-        conn.close()
-        return customer
+            stats = cursor.fetchone()
+            return stats
+        finally:
+            conn.close()
     
-    def find_potential_members_by_name(self, name):
+    def _find_customer(self, cursor, name, email=None):
+        # UPPER(NAME) must stay textually identical to the idx_customer_upper_name_* expressions
+        query = """
+            SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
+            FROM CYEAE_CUSTOMER 
+            WHERE UPPER(NAME) = UPPER(?)
+        """
+        params = [name]
+        if email:
+            query += " AND EMAIL = ?"
+            params.append(email)
+        query += """
+            ORDER BY 
+                CASE WHEN CUSTOMER_TYPE = 'member' THEN 1 ELSE 2 END,
+                CUSTOMER_ID DESC
+            LIMIT 1
+        """
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+    def find_customer_by_name_and_email(self, name, email=None):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        
+        try:
+            cursor = conn.cursor()
+            customer = self._find_customer(cursor, name, email)
+            return customer
+        finally:
+            conn.close()
+    
+    def _find_potential_members(self, cursor, name):
         cursor.execute("""
             SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
             FROM CYEAE_CUSTOMER 
             WHERE UPPER(NAME) = UPPER(?) AND CUSTOMER_TYPE = 'member'
             ORDER BY CUSTOMER_ID DESC
         """, (name,))
-        
-        members = cursor.fetchall()
-        conn.close()
-        return members
+        return cursor.fetchall()
+
+    def find_potential_members_by_name(self, name):
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+            members = self._find_potential_members(cursor, name)
+            return members
+        finally:
+            conn.close()
     
     def verify_member_identity(self, name, email=None, phone=None):
-        conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
-        
         if email:
-            cursor.execute("""
-                SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
-                FROM CYEAE_CUSTOMER 
-                WHERE UPPER(NAME) = UPPER(?) AND EMAIL = ? AND CUSTOMER_TYPE = 'member'
-                LIMIT 1
-            """, (name, email))
+            column, value = 'EMAIL', email
         elif phone:
-            cursor.execute("""
+            column, value = 'PHONE', phone
+        else:
+            return None
+
+        conn = self.db_manager.get_connection()
+        try:
+            cursor = conn.cursor()
+        
+            cursor.execute(f"""
                 SELECT CUSTOMER_ID, NAME, PHONE, EMAIL, ADDRESS, CUSTOMER_TYPE
                 FROM CYEAE_CUSTOMER 
-                WHERE UPPER(NAME) = UPPER(?) AND PHONE = ? AND CUSTOMER_TYPE = 'member'
+                WHERE UPPER(NAME) = UPPER(?) AND {column} = ? AND CUSTOMER_TYPE = 'member'
                 LIMIT 1
-            """, (name, phone))
-        else:
-            conn.close()
-            return None
+            """, (name, value))
         
-        member = cursor.fetchone()
-        conn.close()
-        return member
+            member = cursor.fetchone()
+            return member
+        finally:
+            conn.close()
     
     def save_member_preference(self, customer_id, preference_type, preference_value):
         conn = self.db_manager.get_connection()
@@ -354,50 +1372,68 @@ class CoffeeShopDB:
     
     def get_member_preferences(self, customer_id):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT PREFERENCE_TYPE, PREFERENCE_VALUE, CREATED_DATE
-            FROM CYEAE_MEMBER_PREFERENCES 
-            WHERE CUSTOMER_ID = ?
-            ORDER BY CREATED_DATE DESC
-        """, (customer_id,))
+            cursor.execute("""
+                SELECT PREFERENCE_TYPE, PREFERENCE_VALUE, CREATED_DATE
+                FROM CYEAE_MEMBER_PREFERENCES 
+                WHERE CUSTOMER_ID = ?
+                ORDER BY CREATED_DATE DESC
+            """, (customer_id,))
         
-        preferences = cursor.fetchall()
-        conn.close()
-        return preferences
+            preferences = cursor.fetchall()
+            return preferences
+        finally:
+            conn.close()
     
     def get_member_favorite_products(self, customer_id):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT p.PRODUCT_ID, p.NAME, p.PRICE, SUM(oi.QUANTITY) as total_quantity, COUNT(oi.ORDER_ID) as order_count
-            FROM CYEAE_ORDER_ITEMS oi
-            JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
-            JOIN CYEAE_ORDERS o ON oi.ORDER_ID = o.ORDER_ID
-            WHERE o.CUSTOMER_ID = ?
-            GROUP BY p.PRODUCT_ID, p.NAME, p.PRICE
-            ORDER BY total_quantity DESC, order_count DESC
-            LIMIT 5
-        """, (customer_id,))
+            cursor.execute("""
+                SELECT p.PRODUCT_ID, p.NAME, p.PRICE, SUM(oi.QUANTITY) as total_quantity, COUNT(oi.ORDER_ID) as order_count
+                FROM CYEAE_ORDER_ITEMS oi
+                JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
+                JOIN CYEAE_ORDERS o ON oi.ORDER_ID = o.ORDER_ID
+                WHERE o.CUSTOMER_ID = ?
+                GROUP BY p.PRODUCT_ID, p.NAME, p.PRICE
+                ORDER BY total_quantity DESC, order_count DESC
+                LIMIT 5
+            """, (customer_id,))
         
-        favorites = cursor.fetchall()
-        conn.close()
-        return favorites
+            favorites = cursor.fetchall()
+            return favorites
+        finally:
+            conn.close()
     
     def get_member_by_customer_id(self, customer_id):
         conn = self.db_manager.get_connection()
-        cursor = conn.cursor()
+        try:
+            cursor = conn.cursor()
         
-        cursor.execute("""
-            SELECT c.CUSTOMER_ID, c.NAME, c.PHONE, c.EMAIL, c.ADDRESS, c.CUSTOMER_TYPE,
-                   m.PASSWORD_HASH, m.DATE_OF_BIRTH, m.REGISTRATION_DATE
-            FROM CYEAE_CUSTOMER c
-            LEFT JOIN CYEAE_MEMBER_CUSTOMERS m ON c.CUSTOMER_ID = m.CUSTOMER_ID
-            WHERE c.CUSTOMER_ID = ? AND c.CUSTOMER_TYPE = 'member'
-        """, (customer_id,))
+            cursor.execute("""
+                SELECT c.CUSTOMER_ID, c.NAME, c.PHONE, c.EMAIL, c.ADDRESS, c.CUSTOMER_TYPE,
+                       m.PASSWORD_HASH, m.DATE_OF_BIRTH, m.REGISTRATION_DATE
+                FROM CYEAE_CUSTOMER c
+                LEFT JOIN CYEAE_MEMBER_CUSTOMERS m ON c.CUSTOMER_ID = m.CUSTOMER_ID
+                WHERE c.CUSTOMER_ID = ? AND c.CUSTOMER_TYPE = 'member'
+            """, (customer_id,))
         
-        member = cursor.fetchone()
-        conn.close()
-        return member
\ No newline at end of file
+            member = cursor.fetchone()
+            return member
+        finally:
+            conn.close()
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Coffee shop database maintenance')
+    parser.add_argument('command', choices=['rebuild-rollups'], help='Maintenance task to run')
+    parser.add_argument('--db', default='coffee_shop.db', help='Database file path')
+    args = parser.parse_args()
+
+    if args.command == 'rebuild-rollups':
+        CoffeeShopDB(args.db).rebuild_rollups()
+        print(f"Rollup tables rebuilt for {args.db}")
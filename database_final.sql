@@ -26,6 +26,10 @@ DROP TABLE IF EXISTS CYEAE_MEMBER_PREFERENCES;
 DROP TABLE IF EXISTS CYEAE_PRODUCT;
 DROP TABLE IF EXISTS CYEAE_CATEGORY;
 DROP TABLE IF EXISTS CYEAE_CUSTOMER;
+DROP TABLE IF EXISTS CYEAE_CATALOG_VERSION;
+DROP TABLE IF EXISTS CYEAE_DATA_VERSION;
+DROP TABLE IF EXISTS CYEAE_DAILY_SALES;
+DROP TABLE IF EXISTS CYEAE_CUSTOMER_STATS;
 
 -- Re-enable foreign key checks
 PRAGMA foreign_keys = ON;
@@ -102,6 +106,124 @@ CREATE TABLE CYEAE_ORDER_ITEMS (
     FOREIGN KEY (PRODUCT_ID) REFERENCES CYEAE_PRODUCT(PRODUCT_ID)
 );
 
+-- Catalog version counter (bumped by triggers whenever products or categories change)
+CREATE TABLE CYEAE_CATALOG_VERSION (
+    ID INTEGER PRIMARY KEY CHECK (ID = 1),
+    VERSION INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO CYEAE_CATALOG_VERSION (ID, VERSION) VALUES (1, 0);
+
+-- Order/customer data version counter (bumped once per order write transaction by
+-- CoffeeShopDB._update_rollups and by triggers on customer writes and order/line edits)
+CREATE TABLE CYEAE_DATA_VERSION (
+    ID INTEGER PRIMARY KEY CHECK (ID = 1),
+    VERSION INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO CYEAE_DATA_VERSION (ID, VERSION) VALUES (1, 0);
+
+-- Daily sales rollup (maintained by CoffeeShopDB.create_order in the order transaction;
+-- rebuild with: python database.py rebuild-rollups)
+CREATE TABLE CYEAE_DAILY_SALES (
+    SALES_DATE DATE PRIMARY KEY,
+    ORDER_COUNT INTEGER NOT NULL DEFAULT 0,
+    TOTAL_SALES DECIMAL(14,2) NOT NULL DEFAULT 0,
+    AVG_ORDER_VALUE DECIMAL(12,2) NOT NULL DEFAULT 0
+);
+
+-- Per-customer order aggregates (maintained alongside CYEAE_DAILY_SALES)
+CREATE TABLE CYEAE_CUSTOMER_STATS (
+    CUSTOMER_ID INTEGER PRIMARY KEY,
+    ORDER_COUNT INTEGER NOT NULL DEFAULT 0,
+    TOTAL_SPENT DECIMAL(14,2) NOT NULL DEFAULT 0,
+    FIRST_ORDER_DATE TIMESTAMP,
+    LAST_ORDER_DATE TIMESTAMP,
+    FOREIGN KEY (CUSTOMER_ID) REFERENCES CYEAE_CUSTOMER(CUSTOMER_ID)
+);
+
+-- ============================================================================
+-- TRIGGERS
+-- ============================================================================
+
+CREATE TRIGGER trg_product_insert_catalog_version
+AFTER INSERT ON CYEAE_PRODUCT
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_product_update_catalog_version
+AFTER UPDATE ON CYEAE_PRODUCT
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_product_delete_catalog_version
+AFTER DELETE ON CYEAE_PRODUCT
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_category_insert_catalog_version
+AFTER INSERT ON CYEAE_CATEGORY
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_category_update_catalog_version
+AFTER UPDATE ON CYEAE_CATEGORY
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_category_delete_catalog_version
+AFTER DELETE ON CYEAE_CATEGORY
+BEGIN
+    UPDATE CYEAE_CATALOG_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_customer_insert_data_version
+AFTER INSERT ON CYEAE_CUSTOMER
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_customer_update_data_version
+AFTER UPDATE ON CYEAE_CUSTOMER
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_customer_delete_data_version
+AFTER DELETE ON CYEAE_CUSTOMER
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_orders_update_data_version
+AFTER UPDATE ON CYEAE_ORDERS
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_orders_delete_data_version
+AFTER DELETE ON CYEAE_ORDERS
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_order_items_update_data_version
+AFTER UPDATE ON CYEAE_ORDER_ITEMS
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
+CREATE TRIGGER trg_order_items_delete_data_version
+AFTER DELETE ON CYEAE_ORDER_ITEMS
+BEGIN
+    UPDATE CYEAE_DATA_VERSION SET VERSION = VERSION + 1 WHERE ID = 1;
+END;
+
 -- ============================================================================
 -- SAMPLE DATA INSERTION
 -- ============================================================================
@@ -152,6 +274,19 @@ CREATE INDEX idx_customer_email ON CYEAE_CUSTOMER(EMAIL);
 CREATE INDEX idx_orders_date ON CYEAE_ORDERS(ORDER_DATE);
 CREATE INDEX idx_product_active ON CYEAE_PRODUCT(IS_ACTIVE);
 
+-- Keyset pagination of order history walks (ORDER_DATE, ORDER_ID). ORDER_ID is the
+-- rowid, which SQLite appends to every index key, so idx_orders_date already serves
+-- the unfiltered walk and this index serves the per-customer one.
+CREATE INDEX idx_orders_customer_date ON CYEAE_ORDERS(CUSTOMER_ID, ORDER_DATE);
+
+-- Top-N spenders are an index range scan over the customer stats rollup
+CREATE INDEX idx_customer_stats_spent ON CYEAE_CUSTOMER_STATS(TOTAL_SPENT DESC);
+
+-- Case-insensitive customer lookups (must match UPPER(NAME) = UPPER(?) in database.py)
+CREATE INDEX idx_customer_upper_name_type ON CYEAE_CUSTOMER(UPPER(NAME), CUSTOMER_TYPE);
+CREATE INDEX idx_customer_upper_name_email ON CYEAE_CUSTOMER(UPPER(NAME), EMAIL);
+CREATE INDEX idx_customer_upper_name_phone ON CYEAE_CUSTOMER(UPPER(NAME), PHONE);
+
 -- ============================================================================
 -- VERIFICATION QUERIES
 -- ============================================================================
@@ -11,7 +11,7 @@ import random
 import argparse
 
 def generate_demo_data(seed: int, start_date_str: str, end_date_str: str, num_orders: int, reset_orders: bool,
-                       num_customers: int, member_ratio: float):
+                       num_customers: int, member_ratio: float, batch_size: int = 500):
     """Deterministically generate mixed regular/member customers and orders.
     All customers exist in CYEAE_CUSTOMER; members also exist in CYEAE_MEMBER_CUSTOMERS.
     Orders are within [start_date, end_date].
@@ -27,11 +27,14 @@ def generate_demo_data(seed: int, start_date_str: str, end_date_str: str, num_or
     # Optional reset: only clear orders, keep customers unless desired otherwise
     if reset_orders:
         conn = db.db_manager.get_connection()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM CYEAE_ORDER_ITEMS")
-        cur.execute("DELETE FROM CYEAE_ORDERS")
-        conn.commit()
-        conn.close()
+        try:
+            cur = conn.cursor()
+            cur.execute("DELETE FROM CYEAE_ORDER_ITEMS")
+            cur.execute("DELETE FROM CYEAE_ORDERS")
+            conn.commit()
+        finally:
+            conn.close()
+        db.rebuild_rollups()
         print("♻️  Existing orders cleared.")
 
     # 1) Create customers deterministically
@@ -72,6 +75,15 @@ def generate_demo_data(seed: int, start_date_str: str, end_date_str: str, num_or
     product_ids = [p[0] for p in products]
     payment_methods = ['cash','card','alipay','wechat']
 
+    # Orders are pushed through create_orders in batches: one transaction per batch
+    batch = []
+
+    def flush_batch():
+        order_ids = db.create_orders(batch)
+        for order_id, order in zip(order_ids, batch):
+            print(f"Order #{order_id} for customer {order['customer_id']} at {order['order_date']}")
+        batch.clear()
+
     for _ in range(num_orders):
         cust_id, _ctype = rnd.choice(created_customer_ids)
         k = rnd.randint(1, 4)
@@ -84,15 +96,18 @@ def generate_demo_data(seed: int, start_date_str: str, end_date_str: str, num_or
         if not order_items:
             continue
         pay = rnd.choice(payment_methods)
-        order_id = db.create_order(cust_id, pay, order_items)
-        # set date
         order_dt = start_date + timedelta(days=rnd.randint(0, total_days),
                                           hours=rnd.randint(8, 20), minutes=rnd.randint(0,59), seconds=rnd.randint(0,59))
-        conn = db.db_manager.get_connection()
-        cur = conn.cursor()
-        cur.execute("UPDATE CYEAE_ORDERS SET ORDER_DATE=? WHERE ORDER_ID=?", (order_dt.strftime('%Y-%m-%d %H:%M:%S'), order_id))
-        conn.commit(); conn.close()
-        print(f"Order #{order_id} for customer {cust_id} at {order_dt:%Y-%m-%d %H:%M:%S}")
+        batch.append({
+            'customer_id': cust_id,
+            'payment_method': pay,
+            'items': order_items,
+            'order_date': order_dt.strftime('%Y-%m-%d %H:%M:%S')
+        })
+        if len(batch) >= batch_size:
+            flush_batch()
+    if batch:
+        flush_batch()
 
     # 3) Summary
     print("\nDemo data generation completed!")
@@ -119,6 +134,7 @@ if __name__ == '__main__':
     parser.add_argument('--reset-orders', action='store_true')
     parser.add_argument('--customers', type=int, default=15)
     parser.add_argument('--member-ratio', type=float, default=0.4)
+    parser.add_argument('--batch-size', type=int, default=500, help='Orders committed per transaction')
     args = parser.parse_args()
     generate_demo_data(seed=args.seed,
                        start_date_str=args.start,
@@ -126,4 +142,5 @@ if __name__ == '__main__':
                        num_orders=args.orders,
                        reset_orders=args.reset_orders,
                        num_customers=args.customers,
-                       member_ratio=args.member_ratio)
\ No newline at end of file
+                       member_ratio=args.member_ratio,
+                       batch_size=args.batch_size)
\ No newline at end of file
@@ -10,6 +10,10 @@ set -e  # Exit on any error
 # Configuration
 DB_PATH="coffee_shop.db"
 OUTPUT_DIR="reports"
+JOBS=1
+CONFIG="report_config.yaml"
+PROFILE=""
+DATA_ONLY=false
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # Colors for output
@@ -108,7 +112,17 @@ generate_reports() {
     cd "$SCRIPT_DIR"
     
     # Run the Python report generator
-    python3 report_generator.py --db "$DB_PATH" --output-dir "$OUTPUT_DIR"
+    local extra_args=()
+    if [ -f "$CONFIG" ]; then
+        extra_args+=(--config "$CONFIG")
+    fi
+    if [ -n "$PROFILE" ]; then
+        extra_args+=(--profile "$PROFILE")
+    fi
+    if [ "$DATA_ONLY" = true ]; then
+        extra_args+=(--data-only)
+    fi
+    python3 report_generator.py --db "$DB_PATH" --output-dir "$OUTPUT_DIR" --jobs "$JOBS" "${extra_args[@]}"
     
     if [ $? -eq 0 ]; then
         print_success "Reports generated successfully"
@@ -167,6 +181,10 @@ show_usage() {
     echo "  -h, --help          Show this help message"
     echo "  -d, --db PATH       Database file path (default: coffee_shop.db)"
     echo "  -o, --output DIR    Output directory (default: reports)"
+    echo "  -j, --jobs N        Render reports in N parallel processes (default: 1)"
+    echo "  -c, --config FILE   Report configuration (default: report_config.yaml)"
+    echo "  -p, --profile NAME  Output profile: print, preview or vector"
+    echo "  --data-only        Write CSV data and summary only (no charts, no PDF)"
     echo "  --no-pdf           Skip PDF generation"
     echo "  --no-open          Don't open the generated PDF"
     echo ""
@@ -196,6 +214,23 @@ main() {
                 OUTPUT_DIR="$2"
                 shift 2
                 ;;
+            -j|--jobs)
+                JOBS="$2"
+                shift 2
+                ;;
+            -c|--config)
+                CONFIG="$2"
+                shift 2
+                ;;
+            -p|--profile)
+                PROFILE="$2"
+                shift 2
+                ;;
+            --data-only)
+                DATA_ONLY=true
+                skip_pdf=true
+                shift
+                ;;
             --no-pdf)
                 skip_pdf=true
                 shift
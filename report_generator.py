@@ -5,9 +5,16 @@ Coffee Shop Database Report Generator
 
 This script generates comprehensive reports from the coffee shop database,
 including charts (PNG) and data tables (CSV) for LaTeX integration.
+With --data-only it writes just the CSVs and a JSON summary, without
+importing matplotlib or seaborn. With --export it streams raw order or
+line-item rows for a date range to CSV (optionally gzipped) instead.
 
 Usage:
     python report_generator.py [--config config.yaml] [--output-dir reports/]
+                               [--profile print|preview|vector] [--snapshot wal|backup|none]
+                               [--jobs N] [--force] [--data-only] [--store DIR]
+    python report_generator.py --export orders|order_items|all
+                               [--start YYYY-MM-DD] [--end YYYY-MM-DD] [--gzip]
 
 Author: Coffee Shop Analytics Team
 Date: 2024
@@ -15,22 +22,174 @@ Date: 2024
 
 import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import yaml
 import argparse
 import os
+import time
+import json
+import csv
+import gzip
+import hashlib
+import tempfile
+import heapq
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 import numpy as np
 from pathlib import Path
 
-# Set style for better-looking charts
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+from analytics_store import OrderColumnStore
+
+SNAPSHOT_MODES = ('none', 'wal', 'backup')
+
+# Segment labels from (R, F) scores, checked in order; anything else is 'Needs Attention'
+RFM_SEGMENTS = [
+    ('Champions', lambda r, f: (r >= 4) & (f >= 4)),
+    ('Loyal', lambda r, f: (r >= 3) & (f >= 4)),
+    ('New', lambda r, f: (r >= 4) & (f == 1)),
+    ('Potential Loyalist', lambda r, f: (r >= 4) & (f >= 2)),
+    ('At Risk', lambda r, f: (r <= 2) & (f >= 3)),
+    ('Hibernating', lambda r, f: (r <= 2) & (f <= 2)),
+]
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# Report key -> generator method, in the order run_all_reports produces them
+REPORT_METHODS = {
+    'sales_trends': 'generate_sales_trends_report',
+    'product_performance': 'generate_product_performance_report',
+    'customer_analysis': 'generate_customer_analysis_report',
+    'payment_methods': 'generate_payment_method_report',
+    'rfm_cohorts': 'generate_rfm_cohort_report',
+    'peak_load': 'generate_peak_load_report',
+    'executive_summary': 'generate_executive_summary',
+}
+
+# Which data each report depends on; a report is re-rendered only when one of these moves
+REPORT_INPUTS = {
+    'sales_trends': ('orders', 'today'),
+    'product_performance': ('orders', 'catalog'),
+    'customer_analysis': ('orders', 'customers'),
+    'payment_methods': ('orders',),
+    'rfm_cohorts': ('orders', 'today'),
+    'peak_load': ('orders', 'today'),
+    'executive_summary': ('orders', 'customers', 'catalog', 'today'),
+}
+
+MANIFEST_FILE = 'manifest.json'
+SUMMARY_FILE = 'summary.json'
+
+# Raw exports, streamed in ORDER_DATE order straight off idx_orders_date (no sort step)
+EXPORT_QUERIES = {
+    'orders': """
+        SELECT o.* FROM CYEAE_ORDERS o
+        {where}
+        ORDER BY o.ORDER_DATE, o.ORDER_ID
+    """,
+    'order_items': """
+        SELECT oi.* FROM CYEAE_ORDERS o
+        JOIN CYEAE_ORDER_ITEMS oi ON oi.ORDER_ID = o.ORDER_ID
+        {where}
+        ORDER BY o.ORDER_DATE, o.ORDER_ID, oi.ORDER_ITEM_ID
+    """,
+}
+
+# Output profiles available without a config file; output.profiles in the YAML extends them
+BUILTIN_PROFILES = {
+    'print': {'chart_format': 'png', 'chart_dpi': 300},
+    'preview': {'chart_format': 'png', 'chart_dpi': 72},
+    'vector': {'chart_format': 'svg', 'chart_dpi': 72},
+}
+
+_pyplot = None
+
+def load_pyplot(theme='seaborn-v0_8', palette='husl'):
+    """Import matplotlib/seaborn on first use and apply the chart style.
+
+    Deferred so data-only runs never pay for the plotting stack.
+    """
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
+        # Set style for better-looking charts
+        plt.style.use(theme)
+        sns.set_palette(palette)
+        _pyplot = plt
+    return _pyplot
+
+def resolve_settings(config=None, profile=None):
+    """Flatten report_config.yaml (plus an optional output profile) into generator settings"""
+    config = config or {}
+    output = dict(config.get('output') or {})
+    profiles = dict(BUILTIN_PROFILES)
+    profiles.update(output.pop('profiles', None) or {})
+    profile = profile or output.pop('profile', None)
+    if profile:
+        if profile not in profiles:
+            raise ValueError(f"Unknown output profile: {profile}")
+        output.update(profiles[profile])
+    
+    reports_config = config.get('reports') or {}
+    styling = config.get('styling') or {}
+    return {
+        'profile': profile,
+        'chart_format': str(output.get('chart_format', 'png')).lower(),
+        'chart_dpi': int(output.get('chart_dpi', 300)),
+        'chart_theme': styling.get('theme', 'seaborn-v0_8'),
+        'chart_palette': styling.get('color_palette', 'husl'),
+        'csv_encoding': output.get('csv_encoding', 'utf-8'),
+        'reports': {name: dict(reports_config.get(name) or {}) for name in REPORT_METHODS},
+    }
+
+def _categorical(keys, mapping):
+    """Categorical of mapping[key] for an integer key array; -1 and unmapped keys become NaN"""
+    categories = sorted({value for value in mapping.values() if value is not None})
+    code_of = {value: code for code, value in enumerate(categories)}
+    keys = np.asarray(keys)
+    # One spare slot past the largest key, so key -1 reads a -1 code
+    size = max(max(mapping, default=0), int(keys.max(initial=0))) + 2
+    lookup = np.full(size, -1, dtype=np.int32)
+    for key, value in mapping.items():
+        if value is not None and key >= 0:
+            lookup[key] = code_of[value]
+    return pd.Categorical.from_codes(lookup[keys], categories)
+
+def _json_default(value):
+    """JSON encoder fallback for report results (paths, NumPy scalars, timestamps)"""
+    if isinstance(value, Path):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _run_report_worker(db_path, output_dir, report_name, config, profile, data_only=False, store_dir=None):
+    """Process-pool entry point: render one report on its own read-only connection."""
+    generator = CoffeeShopReportGenerator(db_path, output_dir, snapshot='none', read_only=True,
+                                          config=config, profile=profile, data_only=data_only,
+                                          store_dir=store_dir)
+    try:
+        if not data_only:
+            generator.pyplot().switch_backend('Agg')
+        return report_name, getattr(generator, REPORT_METHODS[report_name])()
+    finally:
+        generator.close()
 
 class CoffeeShopReportGenerator:
-    def __init__(self, db_path='coffee_shop.db', output_dir='reports'):
+    def __init__(self, db_path='coffee_shop.db', output_dir='reports', snapshot='wal', read_only=False,
+                 config=None, profile=None, data_only=False, store_dir=None):
+        if snapshot not in SNAPSHOT_MODES:
+            raise ValueError(f"Unknown snapshot mode: {snapshot}")
         self.db_path = db_path
+        self.read_only = read_only
+        self.config = config or {}
+        self.profile = profile
+        self.settings = resolve_settings(self.config, profile)
+        # Part of the settings so data-only results never stand in for charted ones
+        self.data_only = self.settings['data_only'] = bool(data_only)
+        self.store_dir = store_dir
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         
@@ -40,72 +199,333 @@ class CoffeeShopReportGenerator:
         (self.output_dir / 'latex').mkdir(exist_ok=True)
         
         # Connect to database
-        self.conn = sqlite3.connect(self.db_path)
+        self.snapshot = snapshot
+        self.conn = self.open_snapshot(snapshot)
+        self._dataset = None
         
+    def open_snapshot(self, mode):
+        """Open the connection every report query runs on.
+
+        'wal' holds one read transaction on a read-only connection, so all reports
+        see the same point in time while writers keep appending to the WAL.
+        'backup' copies the database into memory with the online backup API and
+        releases the live file immediately. 'none' reads the live database.
+        """
+        if mode == 'none':
+            if self.read_only:
+                return sqlite3.connect(f"file:{Path(self.db_path).resolve()}?mode=ro", uri=True)
+            return sqlite3.connect(self.db_path)
+        
+        if mode == 'wal':
+            conn = sqlite3.connect(f"file:{Path(self.db_path).resolve()}?mode=ro", uri=True)
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if journal_mode.lower() == 'wal':
+                conn.execute("BEGIN")
+                # The snapshot is pinned by the first read inside the transaction
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                return conn
+            # Without WAL a long read transaction would block writers; copy instead
+            print(f"Database is in {journal_mode} mode, using a backup snapshot instead")
+            conn.close()
+        
+        source = sqlite3.connect(self.db_path)
+        snapshot = sqlite3.connect(':memory:')
+        try:
+            source.backup(snapshot)
+        finally:
+            source.close()
+        return snapshot
+    
     def execute_query(self, query, params=None):
         """Execute SQL query and return DataFrame"""
         return pd.read_sql_query(query, self.conn, params=params)
     
-    def save_chart(self, fig, filename, dpi=300):
-        """Save matplotlib figure as PNG"""
-        chart_path = self.output_dir / 'charts' / f"{filename}.png"
-        fig.savefig(chart_path, dpi=dpi, bbox_inches='tight', 
-                   facecolor='white', edgecolor='none')
-        plt.close(fig)
+    def extract_dataset(self):
+        """Load everything the reports need in one pass and keep it for reuse.
+
+        'items' has one row per order line (orders without lines keep a single
+        row with null item columns), 'orders' one row per order. Customers are
+        only counted here; the in-memory customer analysis loads their rows
+        itself (load_customers), so streaming runs never hold the table.
+        Low-cardinality text columns are categorical.
+        """
+        if self._dataset is not None:
+            return self._dataset
+        
+        start = time.perf_counter()
+        items = self.items_from_store() if self.store_dir else None
+        if items is None:
+            items = self.items_from_sql()
+        customer_count, active_products = self.conn.execute("""
+        SELECT 
+            (SELECT COUNT(*) FROM CYEAE_CUSTOMER),
+            (SELECT COUNT(*) FROM CYEAE_PRODUCT WHERE IS_ACTIVE = 'Y')
+        """).fetchone()
+        extract_seconds = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        orders = items.drop_duplicates('order_id')[
+            ['order_id', 'order_date', 'payment_method', 'total_amount', 'customer_id']
+        ].reset_index(drop=True)
+        
+        self._dataset = {
+            'items': items,
+            'orders': orders,
+            'customer_count': customer_count,
+            'active_products': active_products,
+        }
+        print(f"Extracted {len(orders)} orders / {len(items)} line rows in {extract_seconds:.3f}s "
+              f"(prepared in {time.perf_counter() - start:.3f}s)")
+        return self._dataset
+    
+    def has_table(self, name):
+        return self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone() is not None
+    
+    def customer_order_stats(self):
+        """Per-customer order aggregates, from the CYEAE_CUSTOMER_STATS rollup when it exists.
+
+        Databases without the rollup fall back to aggregating the dataset's orders.
+        """
+        if not self.has_table('CYEAE_CUSTOMER_STATS'):
+            return (self.extract_dataset()['orders'].groupby('customer_id')
+                    .agg(order_count=('order_id', 'count'),
+                         total_spent=('total_amount', 'sum'),
+                         avg_order_value=('total_amount', 'mean'),
+                         last_order_date=('order_date', 'max'),
+                         first_order_date=('order_date', 'min'))
+                    .reset_index())
+        stats = self.execute_query("""
+        SELECT 
+            CUSTOMER_ID as customer_id,
+            ORDER_COUNT as order_count,
+            CAST(TOTAL_SPENT AS REAL) as total_spent,
+            CAST(TOTAL_SPENT AS REAL) / ORDER_COUNT as avg_order_value,
+            LAST_ORDER_DATE as last_order_date,
+            FIRST_ORDER_DATE as first_order_date
+        FROM CYEAE_CUSTOMER_STATS
+        WHERE ORDER_COUNT > 0
+        """)
+        stats['customer_id'] = stats['customer_id'].astype('Int32')
+        return stats
+    
+    def load_customers(self):
+        """One row per customer (id, name, type), for the in-memory customer analysis"""
+        customers = self.execute_query("""
+        SELECT 
+            CUSTOMER_ID as customer_id,
+            NAME as customer_name,
+            CUSTOMER_TYPE as customer_type
+        FROM CYEAE_CUSTOMER
+        """)
+        customers['customer_id'] = customers['customer_id'].astype('Int32')
+        customers['customer_type'] = customers['customer_type'].astype('category')
+        return customers
+    
+    def items_from_sql(self):
+        """The dataset's 'items' frame, read and typed from the OLTP tables"""
+        items = self.execute_query("""
+        SELECT 
+            o.ORDER_ID as order_id,
+            o.ORDER_DATE as order_date,
+            o.PAYMENT_METHOD as payment_method,
+            o.TOTAL_AMOUNT as total_amount,
+            o.CUSTOMER_ID as customer_id,
+            oi.PRODUCT_ID as product_id,
+            p.NAME as product_name,
+            c.CATEGORY_NAME as category_name,
+            oi.QUANTITY as quantity,
+            oi.LINE_AMOUNT as line_amount
+        FROM CYEAE_ORDERS o
+        LEFT JOIN CYEAE_ORDER_ITEMS oi ON oi.ORDER_ID = o.ORDER_ID
+        LEFT JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
+        LEFT JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
+        """)
+        items['order_date'] = pd.to_datetime(items['order_date'])
+        for column in ('order_id', 'customer_id'):
+            items[column] = items[column].astype('Int32')
+        for column in ('payment_method', 'product_name', 'category_name'):
+            items[column] = items[column].astype('category')
+        items['total_amount'] = items['total_amount'].astype('float64')
+        items['line_amount'] = items['line_amount'].astype('float64')
+        return items
+    
+    def items_from_store(self):
+        """The dataset's 'items' frame built from the analytics store's memory-mapped columns.
+
+        Returns None (so the caller falls back to SQL) unless the store holds
+        exactly the snapshot's orders and lines; rows the store has beyond the
+        snapshot are ignored. Product and category names come from the snapshot.
+        """
+        store = OrderColumnStore(self.store_dir)
+        if not store.exists():
+            print(f"Analytics store {self.store_dir} not found; reading from the database")
+            return None
+        snapshot = store.open()
+        order_count, max_order_id = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(ORDER_ID), 0) FROM CYEAE_ORDERS").fetchone()
+        item_count, max_item_id = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(ORDER_ITEM_ID), 0) FROM CYEAE_ORDER_ITEMS").fetchone()
+        n_orders = int(np.searchsorted(snapshot.orders['order_id'], max_order_id, side='right'))
+        n_items = int(np.searchsorted(snapshot.items['order_item_id'], max_item_id, side='right'))
+        if (snapshot.max_order_id < max_order_id or snapshot.max_order_item_id < max_item_id
+                or n_orders != order_count or n_items != item_count):
+            print(f"Analytics store {self.store_dir} does not match the database "
+                  f"(run: python analytics_store.py append); reading from the database")
+            return None
+        
+        orders = {name: values[:n_orders] for name, values in snapshot.orders.items()}
+        lines = {name: values[:n_items] for name, values in snapshot.items.items()}
+        
+        # Line -> row of its order (orders are stored by ascending ORDER_ID); drop orphan lines
+        order_row = np.minimum(np.searchsorted(orders['order_id'], lines['order_id']), max(n_orders - 1, 0))
+        matched = orders['order_id'][order_row] == lines['order_id'] if n_orders else np.zeros(n_items, bool)
+        if not matched.all():
+            lines = {name: values[matched] for name, values in lines.items()}
+            order_row = order_row[matched]
+        # Orders without lines keep one row with null line columns, as in the SQL LEFT JOIN
+        has_lines = np.zeros(n_orders, dtype=bool)
+        has_lines[order_row] = True
+        order_row = np.concatenate([order_row, np.flatnonzero(~has_lines)])
+        n_missing = len(order_row) - len(lines['order_id'])
+        
+        def line_column(values, dtype='float64'):
+            column = np.asarray(values, dtype=dtype)
+            if n_missing:
+                column = np.concatenate([column.astype('float64'), np.full(n_missing, np.nan)])
+            return column
+        
+        catalog = self.conn.execute("""
+            SELECT p.PRODUCT_ID, p.NAME, c.CATEGORY_NAME
+            FROM CYEAE_PRODUCT p
+            LEFT JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
+        """).fetchall()
+        product_ids = np.asarray(lines['product_id'])
+        if n_missing:
+            product_ids = np.concatenate([product_ids, np.full(n_missing, -1, dtype=product_ids.dtype)])
+        customer_ids = orders['customer_id'][order_row]
+        
+        return pd.DataFrame({
+            'order_id': pd.array(orders['order_id'][order_row], dtype='Int32'),
+            'order_date': pd.to_datetime(orders['order_ts'][order_row], unit='s'),
+            'payment_method': _categorical(orders['payment_code'][order_row],
+                                           dict(enumerate(snapshot.dictionaries['payment_method']))),
+            'total_amount': orders['total_cents'][order_row] / 100.0,
+            'customer_id': pd.arrays.IntegerArray(customer_ids.astype('int32'), customer_ids < 0),
+            'product_id': line_column(lines['product_id'], 'int64'),
+            'product_name': _categorical(product_ids, {row[0]: row[1] for row in catalog}),
+            'category_name': _categorical(product_ids, {row[0]: row[2] for row in catalog}),
+            'quantity': line_column(lines['quantity'], 'int64'),
+            'line_amount': line_column(lines['line_cents']) / 100.0,
+        })
+    
+    @staticmethod
+    def days_ago(days):
+        """Midnight UTC `days` days ago, matching SQLite's DATE('now', '-N days')"""
+        today = pd.Timestamp.now(tz='UTC').tz_localize(None).normalize()
+        return today - pd.Timedelta(days=days)
+    
+    def report_setting(self, report, key, default=None):
+        """Per-report option from the config's reports section"""
+        return self.settings['reports'].get(report, {}).get(key, default)
+    
+    def report_enabled(self, report):
+        return bool(self.report_setting(report, 'enabled', True))
+    
+    def pyplot(self):
+        return load_pyplot(self.settings['chart_theme'], self.settings['chart_palette'])
+    
+    def save_chart(self, fig, filename, dpi=None):
+        """Save matplotlib figure in the configured chart format and DPI"""
+        chart_format = self.settings['chart_format']
+        chart_path = self.output_dir / 'charts' / f"{filename}.{chart_format}"
+        fig.savefig(chart_path, format=chart_format, dpi=dpi or self.settings['chart_dpi'],
+                   bbox_inches='tight', facecolor='white', edgecolor='none')
+        self.pyplot().close(fig)
         return chart_path
     
     def save_csv(self, df, filename):
         """Save DataFrame as CSV"""
         csv_path = self.output_dir / 'data' / f"{filename}.csv"
-        df.to_csv(csv_path, index=False)
+        df.to_csv(csv_path, index=False, encoding=self.settings['csv_encoding'])
         return csv_path
     
+    def export_raw(self, table, start=None, end=None, compress=False, chunk_size=10000):
+        """Stream raw rows of `table` ('orders' or 'order_items') to CSV.
+
+        Rows are fetched chunk_size at a time from a cursor and written as they
+        arrive, so memory stays flat however many rows match. start/end are
+        inclusive YYYY-MM-DD dates on ORDER_DATE; either may be omitted.
+        Use the 'wal' or 'none' snapshot for large exports: 'backup' copies the
+        whole database into memory first.
+        """
+        if table not in EXPORT_QUERIES:
+            raise ValueError(f"Unknown export table: {table}")
+        conditions, params = [], []
+        if start:
+            conditions.append("o.ORDER_DATE >= ?")
+            params.append(start)
+        if end:
+            conditions.append("o.ORDER_DATE < DATE(?, '+1 day')")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        export_dir = self.output_dir / 'exports'
+        export_dir.mkdir(exist_ok=True)
+        suffix = '.csv.gz' if compress else '.csv'
+        export_path = export_dir / f"{table}_{start or 'begin'}_{end or 'end'}{suffix}"
+        tmp_path = export_path.with_name(export_path.name + '.tmp')
+        
+        print(f"Exporting {table}...")
+        start_time = time.perf_counter()
+        rows = 0
+        cursor = self.conn.execute(EXPORT_QUERIES[table].format(where=where), params)
+        opener = gzip.open if compress else open
+        try:
+            with opener(tmp_path, 'wt', encoding=self.settings['csv_encoding'], newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow([column[0] for column in cursor.description])
+                while True:
+                    chunk = cursor.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    writer.writerows(chunk)
+                    rows += len(chunk)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        finally:
+            cursor.close()
+        os.replace(tmp_path, export_path)
+        
+        seconds = time.perf_counter() - start_time
+        rate = rows / seconds if seconds > 0 else float(rows)
+        print(f"Exported {rows} rows to {export_path} in {seconds:.2f}s ({rate:,.0f} rows/s)")
+        return {'path': export_path, 'rows': rows, 'seconds': seconds, 'rows_per_second': rate}
+    
     def generate_sales_trends_report(self):
         """Generate daily sales trends report"""
         print("Generating sales trends report...")
         
-        # Get last 30 days of sales data
-        query = """
-        SELECT 
-            DATE(ORDER_DATE) as order_date,
-            COUNT(ORDER_ID) as order_count,
-            SUM(TOTAL_AMOUNT) as total_sales,
-            AVG(TOTAL_AMOUNT) as avg_order_value
-        FROM CYEAE_ORDERS 
-        WHERE DATE(ORDER_DATE) >= DATE('now', '-30 days')
-        GROUP BY DATE(ORDER_DATE)
-        ORDER BY order_date
-        """
-        
-        df = self.execute_query(query)
+        # Last N days of sales, aggregated from the shared dataset
+        days_back = int(self.report_setting('sales_trends', 'days_back', 30))
+        orders = self.extract_dataset()['orders']
+        recent = orders[orders['order_date'] >= self.days_ago(days_back)]
+        df = (recent.groupby(recent['order_date'].dt.strftime('%Y-%m-%d'))['total_amount']
+                    .agg(order_count='count', total_sales='sum', avg_order_value='mean')
+                    .rename_axis('order_date')
+                    .reset_index()
+                    .sort_values('order_date'))
         
         if df.empty:
-            print("No sales data found for the last 30 days")
+            print(f"No sales data found for the last {days_back} days")
             return
         
-        # Create sales trend chart
-        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
-        
-        # Daily sales amount
-        ax1.plot(df['order_date'], df['total_sales'], marker='o', linewidth=2, markersize=6)
-        ax1.set_title('Daily Sales Revenue (Last 30 Days)', fontsize=14, fontweight='bold')
-        ax1.set_ylabel('Sales Amount (HKD)', fontsize=12)
-        ax1.grid(True, alpha=0.3)
-        ax1.tick_params(axis='x', rotation=45)
-        
-        # Daily order count
-        ax2.bar(df['order_date'], df['order_count'], alpha=0.7, color='skyblue')
-        ax2.set_title('Daily Order Count (Last 30 Days)', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Number of Orders', fontsize=12)
-        ax2.set_xlabel('Date', fontsize=12)
-        ax2.grid(True, alpha=0.3)
-        ax2.tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        chart_path = self.save_chart(fig, 'sales_trends')
+        chart_path = None if self.data_only else self.plot_sales_trends(df, days_back)
         csv_path = self.save_csv(df, 'sales_trends')
         
-        print(f"Sales trends chart saved: {chart_path}")
+        if chart_path:
+            print(f"Sales trends chart saved: {chart_path}")
         print(f"Sales trends data saved: {csv_path}")
         
         return {
@@ -123,36 +543,543 @@ class CoffeeShopReportGenerator:
         """Generate product performance analysis"""
         print("Generating product performance report...")
         
-        query = """
-        SELECT 
-            p.NAME as product_name,
-            c.CATEGORY_NAME,
-            SUM(oi.QUANTITY) as total_quantity,
-            SUM(oi.LINE_AMOUNT) as total_revenue,
-            COUNT(DISTINCT oi.ORDER_ID) as order_count,
-            AVG(oi.QUANTITY) as avg_quantity_per_order
-        FROM CYEAE_ORDER_ITEMS oi
-        JOIN CYEAE_PRODUCT p ON oi.PRODUCT_ID = p.PRODUCT_ID
-        JOIN CYEAE_CATEGORY c ON p.CATEGORY_ID = c.CATEGORY_ID
-        GROUP BY p.PRODUCT_ID, p.NAME, c.CATEGORY_NAME
-        ORDER BY total_revenue DESC
+        items = self.extract_dataset()['items'].dropna(subset=['product_id', 'category_name'])
+        df = (items.groupby(['product_id', 'product_name', 'category_name'], observed=True)
+                   .agg(total_quantity=('quantity', 'sum'),
+                        total_revenue=('line_amount', 'sum'),
+                        order_count=('order_id', 'nunique'),
+                        avg_quantity_per_order=('quantity', 'mean'))
+                   .reset_index()
+                   .rename(columns={'category_name': 'CATEGORY_NAME'})
+                   .drop(columns='product_id')
+                   .sort_values('total_revenue', ascending=False, kind='stable')
+                   .reset_index(drop=True))
+        df['product_name'] = df['product_name'].astype(str)
+        df['CATEGORY_NAME'] = df['CATEGORY_NAME'].astype(str)
+        
+        if df.empty:
+            print("No product sales data found")
+            return
+        
+        chart_path = None if self.data_only else self.plot_product_performance(df)
+        csv_path = self.save_csv(df, 'product_performance')
+        
+        if chart_path:
+            print(f"Product performance chart saved: {chart_path}")
+        print(f"Product performance data saved: {csv_path}")
+        
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'summary': {
+                'total_products': len(df),
+                'top_product': df.iloc[0]['product_name'],
+                'top_category': df.groupby('CATEGORY_NAME')['total_revenue'].sum().idxmax(),
+                'total_revenue': df['total_revenue'].sum()
+            }
+        }
+    
+    def generate_customer_analysis_report(self):
+        """Generate customer behavior analysis"""
+        if self.stream_customers():
+            return self.generate_customer_analysis_streaming()
+        print("Generating customer analysis report...")
+        
+        per_customer = self.customer_order_stats()
+        df = (self.load_customers().merge(per_customer, on='customer_id', how='left')
+                                  .rename(columns={'customer_id': 'CUSTOMER_ID',
+                                                   'customer_type': 'CUSTOMER_TYPE'}))
+        df['order_count'] = df['order_count'].fillna(0).astype(int)
+        df['CUSTOMER_TYPE'] = df['CUSTOMER_TYPE'].astype(str)
+        df = df.sort_values('total_spent', ascending=False, kind='stable').reset_index(drop=True)
+        
+        if df.empty:
+            print("No customer data found")
+            return
+        
+        # Calculate customer lifetime (days between first and last order)
+        df['last_order_date'] = pd.to_datetime(df['last_order_date'])
+        df['first_order_date'] = pd.to_datetime(df['first_order_date'])
+        df['customer_lifetime_days'] = (df['last_order_date'] - df['first_order_date']).dt.days
+        df['customer_lifetime_days'] = df['customer_lifetime_days'].fillna(0)
+        
+        chart_path = None if self.data_only else self.plot_customer_analysis(self.customer_chart_data(df))
+        csv_path = self.save_csv(df, 'customer_analysis')
+        
+        if chart_path:
+            print(f"Customer analysis chart saved: {chart_path}")
+        print(f"Customer analysis data saved: {csv_path}")
+        
+        top_n = int(self.report_setting('customer_analysis', 'top_n_customers', 10))
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'summary': {
+                'total_customers': len(df),
+                'active_customers': len(df[df['order_count'] > 0]),
+                'avg_spending': df['total_spent'].mean(),
+                'top_customer': df.iloc[0]['customer_name'] if not df.empty else 'N/A',
+                'top_customers': df.dropna(subset=['total_spent'])['customer_name'].head(top_n).tolist()
+            }
+        }
+    
+    def stream_customers(self):
+        """Whether the customer analysis should run out-of-core (setting 'streaming': true/false/auto)"""
+        streaming = self.report_setting('customer_analysis', 'streaming', 'auto')
+        if streaming != 'auto':
+            return bool(streaming)
+        threshold = int(self.report_setting('customer_analysis', 'streaming_min_customers', 250000))
+        return self.conn.execute("SELECT COUNT(*) FROM CYEAE_CUSTOMER").fetchone()[0] >= threshold
+    
+    def customer_chart_data(self, df):
+        """Inputs of the customer analysis charts, from the full per-customer frame"""
+        type_stats = df.groupby('CUSTOMER_TYPE')['total_spent'].agg(['mean', 'count']).round(2)
+        active = df[df['customer_lifetime_days'] > 0]
+        return {
+            'spending_hist': np.histogram(df.loc[df['total_spent'] > 0, 'total_spent'], bins=20),
+            'type_stats': list(type_stats.itertuples(name=None)),
+            'frequency_hist': np.histogram(df.loc[df['order_count'] > 0, 'order_count'], bins=15),
+            'lifetime_points': (active['customer_lifetime_days'].to_numpy(), active['total_spent'].to_numpy()),
+        }
+    
+    def generate_customer_analysis_streaming(self):
+        """Customer analysis in bounded memory, for very large customer tables.
+
+        Customers are read chunk_size at a time together with their
+        CYEAE_CUSTOMER_STATS rollup. Histogram bin edges are fixed by a MIN/MAX
+        pre-pass, so the binned counts equal the in-memory ones; type averages are
+        running sums, the lifetime scatter is a uniform reservoir sample and the
+        top spenders are kept in a heap. The CSV is appended chunk by chunk, so
+        it is in CUSTOMER_ID order rather than sorted by spend.
         """
+        print("Generating customer analysis report (streaming)...")
+        chunk_size = int(self.report_setting('customer_analysis', 'chunk_size', 50000))
+        sample_size = int(self.report_setting('customer_analysis', 'scatter_sample', 5000))
+        top_n = int(self.report_setting('customer_analysis', 'top_n_customers', 10))
+        
+        min_spent, max_spent, min_orders, max_orders = self.conn.execute("""
+            SELECT MIN(CASE WHEN s.TOTAL_SPENT > 0 THEN s.TOTAL_SPENT END),
+                   MAX(CASE WHEN s.TOTAL_SPENT > 0 THEN s.TOTAL_SPENT END),
+                   MIN(s.ORDER_COUNT), MAX(s.ORDER_COUNT)
+            FROM CYEAE_CUSTOMER_STATS s
+            JOIN CYEAE_CUSTOMER c ON c.CUSTOMER_ID = s.CUSTOMER_ID
+            WHERE s.ORDER_COUNT > 0
+        """).fetchone()
+        spend_range = (float(min_spent), float(max_spent)) if min_spent is not None else None
+        order_range = (float(min_orders), float(max_orders)) if min_orders is not None else None
+        spend_counts, spend_edges = np.histogram([], bins=20, range=spend_range)
+        order_counts, order_edges = np.histogram([], bins=15, range=order_range)
+        
+        type_totals = {}
+        total_customers = active_customers = spent_count = 0
+        spent_sum = 0.0
+        rng = np.random.default_rng(0)
+        sample_keys, sample_days, sample_spent = np.empty(0), np.empty(0), np.empty(0)
+        top = []
+        
+        csv_path = self.output_dir / 'data' / 'customer_analysis.csv'
+        chunks = pd.read_sql_query("""
+        SELECT 
+            c.CUSTOMER_ID,
+            c.NAME as customer_name,
+            c.CUSTOMER_TYPE,
+            COALESCE(s.ORDER_COUNT, 0) as order_count,
+            CASE WHEN s.ORDER_COUNT > 0 THEN s.TOTAL_SPENT END as total_spent,
+            CASE WHEN s.ORDER_COUNT > 0 THEN CAST(s.TOTAL_SPENT AS REAL) / s.ORDER_COUNT END as avg_order_value,
+            s.LAST_ORDER_DATE as last_order_date,
+            s.FIRST_ORDER_DATE as first_order_date
+        FROM CYEAE_CUSTOMER c
+        LEFT JOIN CYEAE_CUSTOMER_STATS s ON s.CUSTOMER_ID = c.CUSTOMER_ID
+        ORDER BY c.CUSTOMER_ID
+        """, self.conn, chunksize=chunk_size)
+        with open(csv_path, 'w', encoding=self.settings['csv_encoding'], newline='') as f:
+            for chunk in chunks:
+                chunk['CUSTOMER_TYPE'] = chunk['CUSTOMER_TYPE'].astype(str)
+                chunk['total_spent'] = chunk['total_spent'].astype('float64')
+                chunk['last_order_date'] = pd.to_datetime(chunk['last_order_date'])
+                chunk['first_order_date'] = pd.to_datetime(chunk['first_order_date'])
+                chunk['customer_lifetime_days'] = (
+                    chunk['last_order_date'] - chunk['first_order_date']).dt.days.fillna(0)
+                chunk.to_csv(f, header=total_customers == 0, index=False)
+                
+                spent = chunk['total_spent']
+                total_customers += len(chunk)
+                active_customers += int((chunk['order_count'] > 0).sum())
+                spent_sum += spent.sum()
+                spent_count += int(spent.count())
+                spend_counts += np.histogram(spent[spent > 0], bins=spend_edges)[0]
+                order_counts += np.histogram(chunk.loc[chunk['order_count'] > 0, 'order_count'],
+                                             bins=order_edges)[0]
+                for type_name, (type_sum, type_count) in (
+                        chunk.groupby('CUSTOMER_TYPE')['total_spent'].agg(['sum', 'count']).iterrows()):
+                    totals = type_totals.setdefault(type_name, [0.0, 0])
+                    totals[0] += type_sum
+                    totals[1] += int(type_count)
+                
+                # Reservoir: keep the sample_size points with the largest random keys
+                active = chunk[chunk['customer_lifetime_days'] > 0]
+                sample_keys = np.concatenate([sample_keys, rng.random(len(active))])
+                sample_days = np.concatenate([sample_days, active['customer_lifetime_days'].to_numpy(float)])
+                sample_spent = np.concatenate([sample_spent, active['total_spent'].to_numpy(float)])
+                if len(sample_keys) > sample_size:
+                    keep = np.argpartition(sample_keys, -sample_size)[-sample_size:]
+                    sample_keys, sample_days, sample_spent = sample_keys[keep], sample_days[keep], sample_spent[keep]
+                
+                # Top spenders: min-heap of (spent, -id) so ties favour the lower CUSTOMER_ID
+                for row in chunk[spent.notna()].nlargest(top_n, 'total_spent').itertuples(index=False):
+                    entry = (row.total_spent, -row.CUSTOMER_ID, row.customer_name)
+                    if len(top) < top_n:
+                        heapq.heappush(top, entry)
+                    elif entry > top[0]:
+                        heapq.heapreplace(top, entry)
+        
+        if total_customers == 0:
+            csv_path.unlink()
+            print("No customer data found")
+            return
+        
+        top_customers = [name for _, _, name in sorted(top, reverse=True)]
+        chart_data = {
+            'spending_hist': (spend_counts, spend_edges),
+            'type_stats': [(type_name, round(type_sum / type_count, 2) if type_count else np.nan, type_count)
+                           for type_name, (type_sum, type_count) in sorted(type_totals.items())],
+            'frequency_hist': (order_counts, order_edges),
+            'lifetime_points': (sample_days, sample_spent),
+        }
+        chart_path = None if self.data_only else self.plot_customer_analysis(chart_data)
+        
+        if chart_path:
+            print(f"Customer analysis chart saved: {chart_path}")
+        print(f"Customer analysis data saved: {csv_path}")
+        
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'summary': {
+                'total_customers': total_customers,
+                'active_customers': active_customers,
+                'avg_spending': spent_sum / spent_count if spent_count else np.nan,
+                'top_customer': top_customers[0] if top_customers else 'N/A',
+                'top_customers': top_customers
+            }
+        }
+    
+    def generate_payment_method_report(self):
+        """Generate payment method analysis"""
+        print("Generating payment method report...")
         
-        df = self.execute_query(query)
+        orders = self.extract_dataset()['orders'].dropna(subset=['payment_method'])
+        df = (orders.groupby('payment_method', observed=True)['total_amount']
+                    .agg(order_count='count', total_revenue='sum', avg_order_value='mean')
+                    .reset_index()
+                    .rename(columns={'payment_method': 'PAYMENT_METHOD'})
+                    .sort_values('total_revenue', ascending=False, kind='stable')
+                    .reset_index(drop=True))
+        df['PAYMENT_METHOD'] = df['PAYMENT_METHOD'].astype(str)
         
         if df.empty:
-            print("No product sales data found")
+            print("No payment method data found")
             return
         
+        chart_path = None if self.data_only else self.plot_payment_methods(df)
+        csv_path = self.save_csv(df, 'payment_methods')
+        
+        if chart_path:
+            print(f"Payment method chart saved: {chart_path}")
+        print(f"Payment method data saved: {csv_path}")
+        
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'summary': {
+                'total_payment_methods': len(df),
+                'most_popular': df.iloc[0]['PAYMENT_METHOD'],
+                'total_orders': df['order_count'].sum(),
+                'total_revenue': df['total_revenue'].sum()
+            }
+        }
+    
+    @staticmethod
+    def quantile_scores(values, bins=5, reverse=False):
+        """Equal-count quantile bins 1..bins (ties split by position), highest values score highest"""
+        scores = np.ceil(values.rank(method='first', pct=True) * bins).astype(int).clip(1, bins)
+        return bins + 1 - scores if reverse else scores
+    
+    def rfm_table(self, orders):
+        """Recency / frequency / monetary scores and segment per customer with orders"""
+        bins = int(self.report_setting('rfm_cohorts', 'score_bins', 5))
+        known = orders[orders['customer_id'].notna()]
+        rfm = (known.groupby('customer_id')
+                    .agg(last_order_date=('order_date', 'max'),
+                         frequency=('order_id', 'count'),
+                         monetary=('total_amount', 'sum'))
+                    .reset_index())
+        rfm['recency_days'] = (self.days_ago(0) - rfm['last_order_date'].dt.normalize()).dt.days
+        rfm['r_score'] = self.quantile_scores(rfm['recency_days'], bins, reverse=True)
+        rfm['f_score'] = self.quantile_scores(rfm['frequency'], bins)
+        rfm['m_score'] = self.quantile_scores(rfm['monetary'], bins)
+        rfm['rfm_score'] = (rfm['r_score'].astype(str) + rfm['f_score'].astype(str)
+                            + rfm['m_score'].astype(str))
+        # Segment rules assume 5 bins; rescale other bin counts onto 1..5
+        r = np.ceil(rfm['r_score'] * 5 / bins).to_numpy()
+        f = np.ceil(rfm['f_score'] * 5 / bins).to_numpy()
+        rfm['segment'] = np.select([rule(r, f) for _, rule in RFM_SEGMENTS],
+                                   [label for label, _ in RFM_SEGMENTS], default='Needs Attention')
+        return rfm[['customer_id', 'recency_days', 'frequency', 'monetary',
+                    'r_score', 'f_score', 'm_score', 'rfm_score', 'segment', 'last_order_date']]
+    
+    @staticmethod
+    def cohort_table(orders):
+        """Monthly acquisition cohorts: active customers per cohort and months since first order.
+
+        Cells a cohort has not reached yet (past the latest order month) are NaN.
+        """
+        known = orders[orders['customer_id'].notna()]
+        month = known['order_date'].to_numpy().astype('datetime64[M]').astype(np.int64)
+        customer = known['customer_id'].to_numpy(dtype=np.int64)
+        cohort = pd.Series(month).groupby(customer).transform('min').to_numpy()
+        active = (pd.DataFrame({'cohort': cohort, 'period': month - cohort, 'customer_id': customer})
+                    .drop_duplicates())
+        counts = active.groupby(['cohort', 'period']).size().unstack(fill_value=0)
+        # Months a cohort has not reached yet are unknown, not zero
+        not_reached = (counts.index.to_numpy()[:, None] + counts.columns.to_numpy()[None, :]) > month.max()
+        counts = counts.astype('float64').mask(not_reached)
+        counts.index = np.datetime_as_string(counts.index.to_numpy().astype('datetime64[M]'))
+        counts.index.name = 'cohort'
+        counts.columns.name = 'months_since_first_order'
+        return counts
+    
+    def generate_rfm_cohort_report(self):
+        """Generate RFM segmentation and monthly cohort retention"""
+        print("Generating RFM and cohort report...")
+        
+        orders = self.extract_dataset()['orders']
+        rfm = self.rfm_table(orders)
+        if rfm.empty:
+            print("No customer orders found")
+            return
+        cohorts = self.cohort_table(orders)
+        retention = cohorts.div(cohorts[0], axis=0).round(4)
+        
+        segments = (rfm.groupby('segment')
+                       .agg(customers=('customer_id', 'count'),
+                            avg_recency_days=('recency_days', 'mean'),
+                            avg_frequency=('frequency', 'mean'),
+                            total_monetary=('monetary', 'sum'))
+                       .sort_values('customers', ascending=False))
+        
+        chart_path = None if self.data_only else self.plot_rfm_cohorts(rfm, segments, retention)
+        csv_path = self.save_csv(rfm, 'rfm_scores')
+        cohort_csv = self.output_dir / 'data' / 'cohort_retention.csv'
+        retention_table = retention.copy()
+        retention_table.insert(0, 'cohort_size', cohorts[0].astype(int))
+        retention_table.to_csv(cohort_csv, encoding=self.settings['csv_encoding'])
+        
+        if chart_path:
+            print(f"RFM and cohort chart saved: {chart_path}")
+        print(f"RFM scores saved: {csv_path}")
+        print(f"Cohort retention saved: {cohort_csv}")
+        
+        month_one = retention[1] if 1 in retention.columns else pd.Series(dtype=float)
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'extra_data': {'cohort_retention': cohort_csv},
+            'summary': {
+                'scored_customers': len(rfm),
+                'segments': segments['customers'].to_dict(),
+                'champions_revenue_share': (
+                    segments['total_monetary'].get('Champions', 0) / segments['total_monetary'].sum()),
+                'cohorts': len(cohorts),
+                'avg_month_1_retention': month_one.mean() if not month_one.empty else None
+            }
+        }
+    
+    def generate_peak_load_report(self):
+        """Generate per-minute / 15-minute throughput and peak-hour analysis"""
+        print("Generating peak load report...")
+        
+        days_back = int(self.report_setting('peak_load', 'days_back', 90))
+        timezone = self.report_setting('peak_load', 'timezone', 'UTC')
+        since = self.days_ago(days_back)
+        dataset = self.extract_dataset()
+        orders = dataset['orders']
+        items = dataset['items']
+        order_times = orders.loc[orders['order_date'] >= since, 'order_date']
+        line_times = items.loc[(items['order_date'] >= since) & items['product_id'].notna(), 'order_date']
+        
+        if order_times.empty:
+            print(f"No orders found for the last {days_back} days")
+            return
+        
+        # ORDER_DATE is stored in UTC; bucket (and count days) on the shop's wall clock
+        window_start = since.tz_localize('UTC').tz_convert(timezone).tz_localize(None).floor('min')
+        window_end = pd.Timestamp.now(tz=timezone).tz_localize(None).floor('min')
+        if timezone != 'UTC':
+            order_times = order_times.dt.tz_localize('UTC').dt.tz_convert(timezone).dt.tz_localize(None)
+            line_times = line_times.dt.tz_localize('UTC').dt.tz_convert(timezone).dt.tz_localize(None)
+        
+        def bucket_counts(freq):
+            counts = pd.DataFrame({
+                'orders': order_times.dt.floor(freq).value_counts(),
+                'line_items': line_times.dt.floor(freq).value_counts(),
+            })
+            counts = counts.fillna(0).astype(int).sort_index()
+            counts.index.name = 'bucket_start'
+            return counts.reset_index()
+        
+        # Busy (non-empty) minutes and quarter hours
+        per_minute = bucket_counts('min')
+        per_quarter = bucket_counts('15min')
+        per_quarter['orders_per_minute'] = per_quarter['orders'] / 15
+        
+        # Percentiles over every minute the shop was open, idle minutes counting as 0
+        minute_of_day = order_times.dt.hour.to_numpy() * 60 + order_times.dt.minute.to_numpy()
+        open_minute, close_minute = self.opening_minutes(minute_of_day)
+        grid = pd.date_range(window_start, window_end, freq='min')
+        grid_minutes = grid.hour * 60 + grid.minute
+        if open_minute <= close_minute:
+            grid = grid[(grid_minutes >= open_minute) & (grid_minutes <= close_minute)]
+        else:  # opening hours past midnight
+            grid = grid[(grid_minutes >= open_minute) | (grid_minutes <= close_minute)]
+        all_minutes = (per_minute.set_index('bucket_start')['orders']
+                       .reindex(grid.union(pd.DatetimeIndex(per_minute['bucket_start'])), fill_value=0))
+        p50, p95, p99 = np.percentile(all_minutes, [50, 95, 99])
+        
+        # Average orders per hour for each weekday x hour, over the local days in the window
+        window_days = pd.date_range(window_start.normalize(), window_end.normalize(), freq='D')
+        n_days = len(window_days)
+        weekday_days = np.bincount(window_days.dayofweek, minlength=7)
+        slots = order_times.dt.dayofweek.to_numpy() * 24 + order_times.dt.hour.to_numpy()
+        hourly = np.bincount(slots, minlength=7 * 24).reshape(7, 24) / np.maximum(weekday_days, 1)[:, None]
+        heatmap = pd.DataFrame(hourly, index=pd.Index(WEEKDAYS, name='weekday'), columns=range(24)).round(3)
+        
+        # Average orders in each 15-minute slot of the day
+        day_profile = np.bincount(minute_of_day // 15, minlength=96) / n_days
+        
+        rates = {'p50': p50, 'p95': p95, 'p99': p99}
+        chart_path = (None if self.data_only
+                      else self.plot_peak_load(per_minute, per_quarter, heatmap, day_profile, rates))
+        csv_path = self.save_csv(per_quarter, 'peak_load_15min')
+        minute_csv = self.save_csv(per_minute, 'peak_load_minutes')
+        heatmap_csv = self.output_dir / 'data' / 'peak_load_heatmap.csv'
+        heatmap.to_csv(heatmap_csv, encoding=self.settings['csv_encoding'])
+        
+        if chart_path:
+            print(f"Peak load chart saved: {chart_path}")
+        print(f"Peak load data saved: {csv_path}")
+        
+        peak_minute = per_minute.loc[per_minute['orders'].idxmax()]
+        peak_quarter = per_quarter.loc[per_quarter['orders'].idxmax()]
+        busiest = np.unravel_index(np.argmax(hourly), hourly.shape)
+        return {
+            'chart': chart_path,
+            'data': csv_path,
+            'extra_data': {'per_minute': minute_csv, 'heatmap': heatmap_csv},
+            'summary': {
+                'timezone': timezone,
+                'opening_hours': f"{open_minute // 60:02d}:{open_minute % 60:02d}-"
+                                 f"{(close_minute + 1) // 60:02d}:{(close_minute + 1) % 60:02d}",
+                'open_minutes': len(all_minutes),
+                'busy_minutes': len(per_minute),
+                'p50_orders_per_minute': p50,
+                'p95_orders_per_minute': p95,
+                'p99_orders_per_minute': p99,
+                'peak_minute': peak_minute['bucket_start'],
+                'peak_minute_orders': int(peak_minute['orders']),
+                'peak_15min': peak_quarter['bucket_start'],
+                'peak_15min_orders': int(peak_quarter['orders']),
+                'busiest_hour': f"{WEEKDAYS[busiest[0]]} {busiest[1]:02d}:00",
+                'busiest_hour_avg_orders': hourly[busiest]
+            }
+        }
+    
+    def opening_minutes(self, minute_of_day):
+        """(first, last) open minute of the day from the 'opening_hours' setting.
+
+        'HH:MM-HH:MM' gives the hours explicitly (end exclusive); 'auto' uses the
+        earliest and latest minute of the day that had an order in the window.
+        """
+        opening_hours = self.report_setting('peak_load', 'opening_hours', 'auto')
+        if opening_hours == 'auto':
+            return int(minute_of_day.min()), int(minute_of_day.max())
+        try:
+            start, end = (datetime.strptime(part.strip(), '%H:%M') for part in opening_hours.split('-'))
+        except ValueError:
+            raise ValueError(f"peak_load.opening_hours must be 'auto' or 'HH:MM-HH:MM', got {opening_hours!r}")
+        return start.hour * 60 + start.minute, end.hour * 60 + end.minute - 1
+    
+    def generate_executive_summary(self):
+        """Generate executive summary with key metrics"""
+        print("Generating executive summary...")
+        
+        dataset = self.extract_dataset()
+        orders = dataset['orders']
+        
+        # Key metrics
+        summary = {
+            'total_revenue': orders['total_amount'].sum(),
+            'total_orders': len(orders),
+            'total_customers': dataset['customer_count'],
+            'active_customers': orders['customer_id'].nunique(),
+            'avg_order_value': orders['total_amount'].mean(),
+            'total_products': dataset['active_products'],
+        }
+        
+        # Recent activity (last 7 days)
+        recent = orders[orders['order_date'] >= self.days_ago(7)]
+        summary['orders_last_7_days'] = len(recent)
+        summary['revenue_last_7_days'] = recent['total_amount'].sum()
+        
+        # Create summary DataFrame
+        summary_df = pd.DataFrame([summary])
+        csv_path = self.save_csv(summary_df, 'executive_summary')
+        
+        print(f"Executive summary saved: {csv_path}")
+        return {
+            'data': csv_path,
+            'summary': summary
+        }
+    
+    def plot_sales_trends(self, df, days_back):
+        """Daily revenue and order-count chart"""
+        plt = self.pyplot()
+        
+        # Create sales trend chart
+        fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10))
+        
+        # Daily sales amount
+        ax1.plot(df['order_date'], df['total_sales'], marker='o', linewidth=2, markersize=6)
+        ax1.set_title(f'Daily Sales Revenue (Last {days_back} Days)', fontsize=14, fontweight='bold')
+        ax1.set_ylabel('Sales Amount (HKD)', fontsize=12)
+        ax1.grid(True, alpha=0.3)
+        ax1.tick_params(axis='x', rotation=45)
+        
+        # Daily order count
+        ax2.bar(df['order_date'], df['order_count'], alpha=0.7, color='skyblue')
+        ax2.set_title(f'Daily Order Count (Last {days_back} Days)', fontsize=14, fontweight='bold')
+        ax2.set_ylabel('Number of Orders', fontsize=12)
+        ax2.set_xlabel('Date', fontsize=12)
+        ax2.grid(True, alpha=0.3)
+        ax2.tick_params(axis='x', rotation=45)
+        
+        plt.tight_layout()
+        return self.save_chart(fig, 'sales_trends')
+    
+    def plot_product_performance(self, df):
+        """Top products and per-category revenue/quantity charts"""
+        plt = self.pyplot()
+        
         # Create product performance charts
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
         
-        # Top 10 products by revenue
-        top_products = df.head(10)
+        # Top N products by revenue
+        top_n = int(self.report_setting('product_performance', 'top_n_products', 10))
+        top_products = df.head(top_n)
         ax1.barh(range(len(top_products)), top_products['total_revenue'])
         ax1.set_yticks(range(len(top_products)))
         ax1.set_yticklabels(top_products['product_name'], fontsize=10)
-        ax1.set_title('Top 10 Products by Revenue', fontsize=14, fontweight='bold')
+        ax1.set_title(f'Top {top_n} Products by Revenue', fontsize=14, fontweight='bold')
         ax1.set_xlabel('Revenue (HKD)', fontsize=12)
         ax1.grid(True, alpha=0.3)
         
@@ -175,84 +1102,36 @@ class CoffeeShopReportGenerator:
         ax3.grid(True, alpha=0.3)
         
         # Average order value by product
-        top_avg = df.nlargest(10, 'avg_quantity_per_order')
+        top_avg = df.nlargest(top_n, 'avg_quantity_per_order')
         ax4.bar(range(len(top_avg)), top_avg['avg_quantity_per_order'], color='lightgreen')
         ax4.set_xticks(range(len(top_avg)))
         ax4.set_xticklabels(top_avg['product_name'], rotation=45, ha='right', fontsize=9)
-        ax4.set_title('Top 10 Products by Avg Quantity per Order', fontsize=14, fontweight='bold')
+        ax4.set_title(f'Top {top_n} Products by Avg Quantity per Order', fontsize=14, fontweight='bold')
         ax4.set_ylabel('Avg Quantity per Order', fontsize=12)
         ax4.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        chart_path = self.save_chart(fig, 'product_performance')
-        csv_path = self.save_csv(df, 'product_performance')
-        
-        print(f"Product performance chart saved: {chart_path}")
-        print(f"Product performance data saved: {csv_path}")
-        
-        return {
-            'chart': chart_path,
-            'data': csv_path,
-            'summary': {
-                'total_products': len(df),
-                'top_product': df.iloc[0]['product_name'],
-                'top_category': df.groupby('CATEGORY_NAME')['total_revenue'].sum().idxmax(),
-                'total_revenue': df['total_revenue'].sum()
-            }
-        }
+        return self.save_chart(fig, 'product_performance')
     
-    def generate_customer_analysis_report(self):
-        """Generate customer behavior analysis"""
-        print("Generating customer analysis report...")
-        
-        query = """
-        SELECT 
-            c.CUSTOMER_ID,
-            c.NAME as customer_name,
-            c.CUSTOMER_TYPE,
-            COUNT(o.ORDER_ID) as order_count,
-            SUM(o.TOTAL_AMOUNT) as total_spent,
-            AVG(o.TOTAL_AMOUNT) as avg_order_value,
-            MAX(o.ORDER_DATE) as last_order_date,
-            MIN(o.ORDER_DATE) as first_order_date
-        FROM CYEAE_CUSTOMER c
-        LEFT JOIN CYEAE_ORDERS o ON c.CUSTOMER_ID = o.CUSTOMER_ID
-        GROUP BY c.CUSTOMER_ID, c.NAME, c.CUSTOMER_TYPE
-        ORDER BY total_spent DESC
-        """
-        
-        df = self.execute_query(query)
-        
-        if df.empty:
-            print("No customer data found")
-            return
-        
-        # Calculate customer lifetime (days between first and last order)
-        df['last_order_date'] = pd.to_datetime(df['last_order_date'])
-        df['first_order_date'] = pd.to_datetime(df['first_order_date'])
-        df['customer_lifetime_days'] = (df['last_order_date'] - df['first_order_date']).dt.days
-        df['customer_lifetime_days'] = df['customer_lifetime_days'].fillna(0)
+    def plot_customer_analysis(self, chart_data):
+        """Spending, customer type, frequency and lifetime charts (see customer_chart_data)"""
+        plt = self.pyplot()
         
         # Create customer analysis charts
         fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
         
-        # Customer spending distribution
-        spending_data = df[df['total_spent'] > 0]['total_spent']
-        ax1.hist(spending_data, bins=20, alpha=0.7, color='skyblue', edgecolor='black')
+        # Customer spending distribution (pre-binned)
+        counts, edges = chart_data['spending_hist']
+        ax1.hist(edges[:-1], bins=edges, weights=counts, alpha=0.7, color='skyblue', edgecolor='black')
         ax1.set_title('Customer Spending Distribution', fontsize=14, fontweight='bold')
         ax1.set_xlabel('Total Spent (HKD)', fontsize=12)
         ax1.set_ylabel('Number of Customers', fontsize=12)
         ax1.grid(True, alpha=0.3)
         
         # Customer type comparison
-        type_stats = df.groupby('CUSTOMER_TYPE').agg({
-            'total_spent': ['mean', 'count'],
-            'order_count': 'mean'
-        }).round(2)
-        
-        types = type_stats.index
-        avg_spending = type_stats[('total_spent', 'mean')]
-        customer_counts = type_stats[('total_spent', 'count')]
+        types = [row[0] for row in chart_data['type_stats']]
+        avg_spending = pd.Series([row[1] for row in chart_data['type_stats']])
+        customer_counts = [row[2] for row in chart_data['type_stats']]
         
         ax2.bar(types, avg_spending, alpha=0.7, color=['lightcoral', 'lightgreen'])
         ax2.set_title('Average Spending by Customer Type', fontsize=14, fontweight='bold')
@@ -263,19 +1142,19 @@ class CoffeeShopReportGenerator:
         for i, (type_name, count) in enumerate(zip(types, customer_counts)):
             ax2.text(i, avg_spending.iloc[i] + 5, f'n={count}', ha='center', fontsize=10)
         
-        # Order frequency distribution
-        order_freq = df[df['order_count'] > 0]['order_count']
-        ax3.hist(order_freq, bins=15, alpha=0.7, color='lightgreen', edgecolor='black')
+        # Order frequency distribution (pre-binned)
+        counts, edges = chart_data['frequency_hist']
+        ax3.hist(edges[:-1], bins=edges, weights=counts, alpha=0.7, color='lightgreen', edgecolor='black')
         ax3.set_title('Order Frequency Distribution', fontsize=14, fontweight='bold')
         ax3.set_xlabel('Number of Orders', fontsize=12)
         ax3.set_ylabel('Number of Customers', fontsize=12)
         ax3.grid(True, alpha=0.3)
         
         # Customer lifetime vs spending
-        active_customers = df[df['customer_lifetime_days'] > 0]
-        if not active_customers.empty:
-            ax4.scatter(active_customers['customer_lifetime_days'], 
-                       active_customers['total_spent'], 
+        lifetime_days, total_spent = chart_data['lifetime_points']
+        if len(lifetime_days):
+            ax4.scatter(lifetime_days, 
+                       total_spent, 
                        alpha=0.6, s=60)
             ax4.set_title('Customer Lifetime vs Total Spending', fontsize=14, fontweight='bold')
             ax4.set_xlabel('Customer Lifetime (Days)', fontsize=12)
@@ -283,44 +1162,111 @@ class CoffeeShopReportGenerator:
             ax4.grid(True, alpha=0.3)
         
         plt.tight_layout()
-        chart_path = self.save_chart(fig, 'customer_analysis')
-        csv_path = self.save_csv(df, 'customer_analysis')
+        return self.save_chart(fig, 'customer_analysis')
+    
+    def plot_rfm_cohorts(self, rfm, segments, retention):
+        """Segment sizes, cohort retention curves and heatmap, R x F average spend heatmap"""
+        plt = self.pyplot()
+        max_cohorts = int(self.report_setting('rfm_cohorts', 'max_cohorts', 12))
         
-        print(f"Customer analysis chart saved: {chart_path}")
-        print(f"Customer analysis data saved: {csv_path}")
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
         
-        return {
-            'chart': chart_path,
-            'data': csv_path,
-            'summary': {
-                'total_customers': len(df),
-                'active_customers': len(df[df['order_count'] > 0]),
-                'avg_spending': df['total_spent'].mean(),
-                'top_customer': df.iloc[0]['customer_name'] if not df.empty else 'N/A'
-            }
-        }
+        # Customers per segment
+        ax1.barh(segments.index[::-1], segments['customers'][::-1], color='skyblue', alpha=0.8)
+        ax1.set_title('Customers by RFM Segment', fontsize=14, fontweight='bold')
+        ax1.set_xlabel('Number of Customers', fontsize=12)
+        ax1.grid(True, alpha=0.3)
+        
+        # Retention curves of the most recent cohorts
+        recent = retention.tail(max_cohorts).dropna(axis=1, how='all')
+        for cohort, curve in recent.iterrows():
+            curve = curve.dropna()
+            ax2.plot(curve.index, curve.to_numpy() * 100, marker='o', linewidth=1.5, markersize=4, label=cohort)
+        ax2.set_title('Cohort Retention Curves', fontsize=14, fontweight='bold')
+        ax2.set_xlabel('Months Since First Order', fontsize=12)
+        ax2.set_ylabel('Active Customers (%)', fontsize=12)
+        ax2.legend(fontsize=8, ncol=2)
+        ax2.grid(True, alpha=0.3)
+        
+        # Average spend for each recency x frequency score
+        grid = rfm.pivot_table(index='r_score', columns='f_score', values='monetary', aggfunc='mean')
+        image = ax3.imshow(grid.to_numpy(), cmap='YlGnBu', origin='lower', aspect='auto')
+        ax3.set_xticks(range(len(grid.columns)))
+        ax3.set_xticklabels(grid.columns)
+        ax3.set_yticks(range(len(grid.index)))
+        ax3.set_yticklabels(grid.index)
+        ax3.set_title('Average Spend by Recency x Frequency Score', fontsize=14, fontweight='bold')
+        ax3.set_xlabel('Frequency Score', fontsize=12)
+        ax3.set_ylabel('Recency Score', fontsize=12)
+        ax3.grid(False)
+        fig.colorbar(image, ax=ax3, label='Average Spend (HKD)')
+        
+        # Retention of the most recent cohorts
+        image = ax4.imshow(recent.to_numpy() * 100, cmap='Greens', vmin=0, vmax=100, aspect='auto')
+        ax4.set_xticks(range(len(recent.columns)))
+        ax4.set_xticklabels(recent.columns)
+        ax4.set_yticks(range(len(recent.index)))
+        ax4.set_yticklabels(recent.index, fontsize=9)
+        ax4.set_title('Monthly Cohort Retention (%)', fontsize=14, fontweight='bold')
+        ax4.set_xlabel('Months Since First Order', fontsize=12)
+        ax4.set_ylabel('Cohort', fontsize=12)
+        ax4.grid(False)
+        fig.colorbar(image, ax=ax4, label='Active Customers (%)')
+        
+        plt.tight_layout()
+        return self.save_chart(fig, 'rfm_cohorts')
     
-    def generate_payment_method_report(self):
-        """Generate payment method analysis"""
-        print("Generating payment method report...")
+    def plot_peak_load(self, per_minute, per_quarter, heatmap, day_profile, rates):
+        """Per-minute rate distribution, daily 15-minute profile, weekday x hour heatmap, top buckets"""
+        plt = self.pyplot()
         
-        query = """
-        SELECT 
-            PAYMENT_METHOD,
-            COUNT(*) as order_count,
-            SUM(TOTAL_AMOUNT) as total_revenue,
-            AVG(TOTAL_AMOUNT) as avg_order_value
-        FROM CYEAE_ORDERS
-        WHERE PAYMENT_METHOD IS NOT NULL
-        GROUP BY PAYMENT_METHOD
-        ORDER BY total_revenue DESC
-        """
+        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
         
-        df = self.execute_query(query)
+        # Orders per busy minute, with percentiles
+        max_rate = int(per_minute['orders'].max())
+        ax1.hist(per_minute['orders'], bins=np.arange(0.5, max_rate + 1.5), alpha=0.7,
+                 color='skyblue', edgecolor='black')
+        for (label, value), color in zip(rates.items(), ['green', 'orange', 'red']):
+            ax1.axvline(value, color=color, linestyle='--', linewidth=2, label=f'{label} = {value:.1f}')
+        ax1.set_title('Orders per Minute (Busy Minutes)', fontsize=14, fontweight='bold')
+        ax1.set_xlabel('Orders in Minute', fontsize=12)
+        ax1.set_ylabel('Number of Minutes', fontsize=12)
+        ax1.legend()
+        ax1.grid(True, alpha=0.3)
         
-        if df.empty:
-            print("No payment method data found")
-            return
+        # Average orders in each 15-minute slot of the day
+        slot_hours = np.arange(len(day_profile)) / 4
+        ax2.bar(slot_hours, day_profile, width=0.25, align='edge', color='lightcoral', alpha=0.8)
+        ax2.set_title('Average Orders per 15 Minutes by Time of Day', fontsize=14, fontweight='bold')
+        ax2.set_xlabel('Hour of Day', fontsize=12)
+        ax2.set_ylabel('Average Orders', fontsize=12)
+        ax2.set_xticks(range(0, 25, 2))
+        ax2.set_xlim(0, 24)
+        ax2.grid(True, alpha=0.3)
+        
+        # Weekday x hour heatmap
+        image = ax3.imshow(heatmap.to_numpy(), cmap='YlOrRd', aspect='auto')
+        ax3.set_xticks(range(0, 24, 2))
+        ax3.set_yticks(range(len(heatmap.index)))
+        ax3.set_yticklabels(heatmap.index)
+        ax3.set_title('Average Orders per Hour by Weekday', fontsize=14, fontweight='bold')
+        ax3.set_xlabel('Hour of Day', fontsize=12)
+        ax3.grid(False)
+        fig.colorbar(image, ax=ax3, label='Orders per Hour')
+        
+        # Busiest 15-minute buckets
+        top = per_quarter.nlargest(10, 'orders').iloc[::-1]
+        ax4.barh(top['bucket_start'].dt.strftime('%Y-%m-%d %H:%M'), top['orders'], color='lightgreen', alpha=0.8)
+        ax4.set_title('Busiest 15-Minute Periods', fontsize=14, fontweight='bold')
+        ax4.set_xlabel('Orders', fontsize=12)
+        ax4.grid(True, alpha=0.3)
+        
+        plt.tight_layout()
+        return self.save_chart(fig, 'peak_load')
+    
+    def plot_payment_methods(self, df):
+        """Revenue share and order count by payment method"""
+        plt = self.pyplot()
         
         # Create payment method charts
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
@@ -349,72 +1295,29 @@ class CoffeeShopReportGenerator:
                     f'{int(height)}', ha='center', va='bottom', fontsize=10)
         
         plt.tight_layout()
-        chart_path = self.save_chart(fig, 'payment_methods')
-        csv_path = self.save_csv(df, 'payment_methods')
-        
-        print(f"Payment method chart saved: {chart_path}")
-        print(f"Payment method data saved: {csv_path}")
-        
-        return {
-            'chart': chart_path,
-            'data': csv_path,
-            'summary': {
-                'total_payment_methods': len(df),
-                'most_popular': df.iloc[0]['PAYMENT_METHOD'],
-                'total_orders': df['order_count'].sum(),
-                'total_revenue': df['total_revenue'].sum()
-            }
-        }
-    
-    def generate_executive_summary(self):
-        """Generate executive summary with key metrics"""
-        print("Generating executive summary...")
-        
-        # Get key metrics
-        metrics_queries = {
-            'total_revenue': "SELECT SUM(TOTAL_AMOUNT) as total FROM CYEAE_ORDERS",
-            'total_orders': "SELECT COUNT(*) as total FROM CYEAE_ORDERS",
-            'total_customers': "SELECT COUNT(*) as total FROM CYEAE_CUSTOMER",
-            'active_customers': "SELECT COUNT(DISTINCT CUSTOMER_ID) as total FROM CYEAE_ORDERS",
-            'avg_order_value': "SELECT AVG(TOTAL_AMOUNT) as total FROM CYEAE_ORDERS",
-            'total_products': "SELECT COUNT(*) as total FROM CYEAE_PRODUCT WHERE IS_ACTIVE = 'Y'"
-        }
-        
-        summary = {}
-        for metric, query in metrics_queries.items():
-            result = self.execute_query(query)
-            summary[metric] = result.iloc[0]['total'] if not result.empty else 0
-        
-        # Get recent activity (last 7 days)
-        recent_query = """
-        SELECT 
-            COUNT(*) as orders_last_7_days,
-            SUM(TOTAL_AMOUNT) as revenue_last_7_days
-        FROM CYEAE_ORDERS 
-        WHERE DATE(ORDER_DATE) >= DATE('now', '-7 days')
-        """
-        recent_result = self.execute_query(recent_query)
-        if not recent_result.empty:
-            summary['orders_last_7_days'] = recent_result.iloc[0]['orders_last_7_days']
-            summary['revenue_last_7_days'] = recent_result.iloc[0]['revenue_last_7_days']
-        else:
-            summary['orders_last_7_days'] = 0
-            summary['revenue_last_7_days'] = 0
-        
-        # Create summary DataFrame
-        summary_df = pd.DataFrame([summary])
-        csv_path = self.save_csv(summary_df, 'executive_summary')
-        
-        print(f"Executive summary saved: {csv_path}")
-        return {
-            'data': csv_path,
-            'summary': summary
-        }
+        return self.save_chart(fig, 'payment_methods')
     
     def generate_latex_report(self, reports):
         """Generate LaTeX report with all charts and data"""
         print("Generating LaTeX report...")
         
+        figures = []
+        for name in REPORT_METHODS:
+            chart = (reports.get(name) or {}).get('chart')
+            if chart is None:
+                continue
+            title = name.replace('_', ' ').capitalize()
+            if Path(chart).suffix.lower() not in ('.png', '.pdf', '.jpg', '.jpeg'):
+                # pdflatex cannot include e.g. SVG preview charts
+                figures.append(f"% {title}: {Path(chart).name} (not includable by pdflatex)\n")
+                continue
+            figures.append(f"""% {title}
+\\begin{{figure}}[h]
+\\centering
+\\includegraphics[width=0.95\\textwidth]{{../charts/{Path(chart).name}}}
+\\end{{figure}}
+""")
+        
         latex_content = """
 \\documentclass[11pt,a4paper]{article}
 \\usepackage[margin=1in]{geometry}
@@ -424,30 +1327,7 @@ class CoffeeShopReportGenerator:
 \\begin{document}
 \\maketitle
 
-% Sales trends
-\\begin{figure}[h]
-\\centering
-\\includegraphics[width=0.95\\textwidth]{../charts/sales_trends.png}
-\\end{figure}
-
-% Product performance
-\\begin{figure}[h]
-\\centering
-\\includegraphics[width=0.95\\textwidth]{../charts/product_performance.png}
-\\end{figure}
-
-% Customer analysis
-\\begin{figure}[h]
-\\centering
-\\includegraphics[width=0.95\\textwidth]{../charts/customer_analysis.png}
-\\end{figure}
-
-% Payment methods
-\\begin{figure}[h]
-\\centering
-\\includegraphics[width=0.95\\textwidth]{../charts/payment_methods.png}
-\\end{figure}
-
+""" + "\n".join(figures) + """
 \\end{document}
 """
         
@@ -458,8 +1338,169 @@ class CoffeeShopReportGenerator:
         print(f"LaTeX report saved: {latex_path}")
         return latex_path
     
-    def run_all_reports(self):
-        """Generate all reports"""
+    def compute_watermark(self):
+        """Cheap fingerprint of the data behind each report input (see REPORT_INPUTS).
+
+        PRAGMA data_version only changes within one connection's lifetime, so
+        across runs the watermark uses max IDs and row counts, which move on
+        every insert and delete, plus a hash of the small catalog tables.
+        In-place edits are caught by CYEAE_DATA_VERSION, which triggers bump
+        on order, order line and customer updates, or by a checksum over the
+        mutable columns when the database predates that table.
+        """
+        orders = self.conn.execute(
+            "SELECT COALESCE(MAX(ORDER_ID), 0), COUNT(*) FROM CYEAE_ORDERS").fetchone()
+        items = self.conn.execute(
+            "SELECT COALESCE(MAX(ORDER_ITEM_ID), 0), COUNT(*) FROM CYEAE_ORDER_ITEMS").fetchone()
+        customers = self.conn.execute(
+            "SELECT COALESCE(MAX(CUSTOMER_ID), 0), COUNT(*) FROM CYEAE_CUSTOMER").fetchone()
+        catalog = hashlib.sha256()
+        for table in ('CYEAE_PRODUCT', 'CYEAE_CATEGORY'):
+            for row in self.conn.execute(f"SELECT * FROM {table} ORDER BY 1"):
+                catalog.update(repr(row).encode('utf-8'))
+        order_edits, customer_edits = self.edit_markers()
+        
+        return {
+            'orders': {'max_order_id': orders[0], 'order_count': orders[1],
+                       'max_order_item_id': items[0], 'order_item_count': items[1],
+                       'edits': order_edits},
+            'customers': {'max_customer_id': customers[0], 'customer_count': customers[1],
+                          'edits': customer_edits},
+            'catalog': catalog.hexdigest(),
+            'today': self.days_ago(0).strftime('%Y-%m-%d'),
+        }
+
+    def edit_markers(self):
+        """(orders marker, customers marker) that change on in-place UPDATEs"""
+        if self.has_table('CYEAE_DATA_VERSION'):
+            version = self.conn.execute("SELECT VERSION FROM CYEAE_DATA_VERSION WHERE ID = 1").fetchone()
+            version = version[0] if version else 0
+            return version, version
+        # ID-weighted sums so that edits moving values between rows still change the result
+        # Grouping by payment method moves an order's ID between groups when its method changes
+        orders = tuple(self.conn.execute("""
+            SELECT PAYMENT_METHOD, TOTAL(TOTAL_AMOUNT * ORDER_ID), TOTAL(COALESCE(CUSTOMER_ID, 0) * ORDER_ID),
+                   TOTAL(julianday(ORDER_DATE) * ORDER_ID), TOTAL(ORDER_ID)
+            FROM CYEAE_ORDERS
+            GROUP BY PAYMENT_METHOD
+            ORDER BY PAYMENT_METHOD
+        """).fetchall())
+        items = self.conn.execute("""
+            SELECT TOTAL(QUANTITY * ORDER_ITEM_ID), TOTAL(LINE_AMOUNT * ORDER_ITEM_ID),
+                   TOTAL(UNIT_PRICE * ORDER_ITEM_ID), TOTAL(PRODUCT_ID * ORDER_ITEM_ID),
+                   TOTAL(ORDER_ID * ORDER_ITEM_ID)
+            FROM CYEAE_ORDER_ITEMS
+        """).fetchone()
+        customers = hashlib.sha256()
+        for row in self.conn.execute(
+                "SELECT CUSTOMER_ID, NAME, CUSTOMER_TYPE, EMAIL, PHONE FROM CYEAE_CUSTOMER ORDER BY 1"):
+            customers.update(repr(row).encode('utf-8'))
+        return repr((orders, items)), customers.hexdigest()
+    
+    def config_hash(self):
+        """Hash of the settings that affect rendered output"""
+        payload = json.dumps(self.settings, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def report_key(self, name, watermark):
+        key = {source: watermark[source] for source in REPORT_INPUTS[name]}
+        key['config'] = self.config_hash()
+        return key
+    
+    def load_manifest(self):
+        manifest_path = self.output_dir / MANIFEST_FILE
+        if not manifest_path.exists():
+            return {'reports': {}}
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'reports': {}}
+    
+    def save_manifest(self, watermark, reports, keys):
+        manifest = {
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'watermark': watermark,
+            'config_hash': self.config_hash(),
+            'reports': {name: {'key': keys[name], 'result': reports[name]} for name in reports},
+        }
+        manifest_path = self.output_dir / MANIFEST_FILE
+        tmp_path = manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+        os.replace(tmp_path, manifest_path)
+        return manifest_path
+    
+    def save_summary(self, reports):
+        """Write each report's summary metrics to data/summary.json"""
+        summary = {name: (result or {}).get('summary') for name, result in reports.items()}
+        summary_path = self.output_dir / 'data' / SUMMARY_FILE
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, default=_json_default)
+        return summary_path
+    
+    def cached_result(self, name, key, manifest):
+        """Previous result for a report if its inputs are unchanged and its files still exist"""
+        entry = manifest.get('reports', {}).get(name)
+        if not entry or entry.get('key') != json.loads(json.dumps(key, default=_json_default)):
+            return None, False
+        result = entry.get('result')
+        if result is None:
+            return None, True
+        for artifact in ('chart', 'data'):
+            if result.get(artifact) is not None:
+                result[artifact] = Path(result[artifact])
+                if not result[artifact].exists():
+                    return None, False
+        for table, path in (result.get('extra_data') or {}).items():
+            result['extra_data'][table] = Path(path)
+            if not result['extra_data'][table].exists():
+                return None, False
+        return result, True
+    
+    def run_reports_parallel(self, jobs, names=None):
+        """Render each report in its own worker process.
+
+        Workers read a file copy of this generator's snapshot (or the live
+        database when snapshot='none'), so parallel runs stay consistent.
+        """
+        snapshot_path = None
+        db_path = self.db_path
+        if self.snapshot != 'none':
+            fd, snapshot_path = tempfile.mkstemp(suffix='.db', prefix='report_snapshot_')
+            os.close(fd)
+            dest = sqlite3.connect(snapshot_path)
+            try:
+                self.conn.backup(dest)
+                # Workers only read the copy; rollback-journal mode avoids -wal/-shm files
+                dest.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                dest.close()
+            db_path = snapshot_path
+        
+        try:
+            results = {}
+            names = list(REPORT_METHODS) if names is None else names
+            with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(names)))) as executor:
+                futures = [executor.submit(_run_report_worker, db_path, str(self.output_dir), name,
+                                           self.config, self.profile, self.data_only, self.store_dir)
+                           for name in names]
+                for future in futures:
+                    name, result = future.result()
+                    results[name] = result
+            # Keep the sequential run's key order
+            return {name: results[name] for name in names}
+        finally:
+            if snapshot_path:
+                os.remove(snapshot_path)
+    
+    def run_all_reports(self, jobs=1, force=False):
+        """Generate all reports whose inputs changed since the last run.
+
+        Runs in a process pool when jobs > 1; force=True ignores the manifest.
+        In data-only mode no charts or LaTeX are produced and the report
+        summaries are written to data/summary.json instead.
+        """
         print("=" * 60)
         print("COFFEE SHOP DATABASE REPORT GENERATOR")
         print("=" * 60)
@@ -467,14 +1508,48 @@ class CoffeeShopReportGenerator:
         print(f"Output Directory: {self.output_dir}")
         print("=" * 60)
         
-        reports = {}
+        if self.settings['profile']:
+            print(f"Output profile: {self.settings['profile']} "
+                  f"({self.settings['chart_format']}, {self.settings['chart_dpi']} dpi)")
         
-        # Generate all reports
-        reports['sales_trends'] = self.generate_sales_trends_report()
-        reports['product_performance'] = self.generate_product_performance_report()
-        reports['customer_analysis'] = self.generate_customer_analysis_report()
-        reports['payment_methods'] = self.generate_payment_method_report()
-        reports['executive_summary'] = self.generate_executive_summary()
+        # Disabled reports are neither queried nor rendered
+        enabled = [name for name in REPORT_METHODS if self.report_enabled(name)]
+        for name in REPORT_METHODS:
+            if name not in enabled:
+                print(f"Skipping {name}: disabled in config")
+        
+        # Work out which reports are stale against the last manifest
+        watermark = self.compute_watermark()
+        manifest = {'reports': {}} if force else self.load_manifest()
+        keys = {name: self.report_key(name, watermark) for name in enabled}
+        cached = {}
+        for name in enabled:
+            result, fresh = self.cached_result(name, keys[name], manifest)
+            if fresh:
+                cached[name] = result
+        stale = [name for name in enabled if name not in cached]
+        for name in cached:
+            print(f"Skipping {name}: inputs unchanged since last run")
+        
+        # Generate the stale reports
+        if jobs > 1 and len(stale) > 1:
+            rendered = self.run_reports_parallel(jobs, stale)
+        else:
+            rendered = {name: getattr(self, REPORT_METHODS[name])() for name in stale}
+        reports = {name: rendered[name] if name in rendered else cached[name] for name in enabled}
+        
+        manifest_path = self.save_manifest(watermark, reports, keys)
+        print(f"Manifest saved: {manifest_path}")
+        
+        if self.data_only:
+            summary_path = self.save_summary(reports)
+            print("=" * 60)
+            print("DATA EXPORT COMPLETE")
+            print("=" * 60)
+            print(f"CSV data saved to: {self.output_dir / 'data'}")
+            print(f"Summary: {summary_path}")
+            print("=" * 60)
+            return reports
         
         # Generate LaTeX report
         latex_path = self.generate_latex_report(reports)
@@ -491,23 +1566,66 @@ class CoffeeShopReportGenerator:
         return reports
     
     def close(self):
-        """Close database connection"""
+        """Close database connection (ending any snapshot read transaction)"""
+        if self.conn.in_transaction:
+            self.conn.rollback()
         self.conn.close()
 
+def export_date(value):
+    """argparse type for --start/--end"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date (expected YYYY-MM-DD): {value}")
+
 def main():
     parser = argparse.ArgumentParser(description='Generate coffee shop database reports')
-    parser.add_argument('--db', default='coffee_shop.db', help='Database file path')
-    parser.add_argument('--output-dir', default='reports', help='Output directory')
+    parser.add_argument('--db', help='Database file path (default: config database.path or coffee_shop.db)')
+    parser.add_argument('--output-dir', help='Output directory (default: config output.directory or reports)')
     parser.add_argument('--config', help='Configuration file (YAML)')
+    parser.add_argument('--profile', help='Output profile, e.g. print (300-dpi PNG), preview (72-dpi PNG) or vector (SVG)')
+    parser.add_argument('--snapshot', choices=SNAPSHOT_MODES, default='wal',
+                        help='Consistent read strategy: WAL read transaction, in-memory backup, or live reads')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Render reports in N worker processes (default: 1, sequential)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-render every report even if its inputs are unchanged')
+    parser.add_argument('--data-only', action='store_true',
+                        help='Write only the CSV data and a JSON summary (no charts, no LaTeX)')
+    parser.add_argument('--store', help='Read order data from this analytics store directory '
+                                        '(see analytics_store.py) when it matches the database')
+    parser.add_argument('--export', choices=list(EXPORT_QUERIES) + ['all'],
+                        help='Stream raw rows to OUTPUT_DIR/exports instead of generating reports')
+    parser.add_argument('--start', type=export_date, help='First ORDER_DATE day to export (YYYY-MM-DD)')
+    parser.add_argument('--end', type=export_date, help='Last ORDER_DATE day to export (YYYY-MM-DD)')
+    parser.add_argument('--gzip', action='store_true', help='Gzip-compress exported CSV files')
+    parser.add_argument('--chunk-size', type=int, default=10000,
+                        help='Rows fetched per chunk during export (default: 10000)')
     
     args = parser.parse_args()
     
+    config = {}
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    db_path = args.db or (config.get('database') or {}).get('path') or 'coffee_shop.db'
+    output_dir = args.output_dir or (config.get('output') or {}).get('directory') or 'reports'
+    
     # Initialize report generator
-    generator = CoffeeShopReportGenerator(args.db, args.output_dir)
+    generator = CoffeeShopReportGenerator(db_path, output_dir, snapshot=args.snapshot,
+                                          config=config, profile=args.profile, data_only=args.data_only,
+                                          store_dir=args.store)
     
     try:
+        if args.export:
+            tables = list(EXPORT_QUERIES) if args.export == 'all' else [args.export]
+            for table in tables:
+                generator.export_raw(table, start=args.start, end=args.end,
+                                     compress=args.gzip, chunk_size=args.chunk_size)
+            return
+        
         # Generate all reports
-        reports = generator.run_all_reports()
+        reports = generator.run_all_reports(jobs=args.jobs, force=args.force)
         
     finally:
         generator.close()
@@ -0,0 +1,25 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from database import CoffeeShopDB
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / 'database_final.sql'
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'coffee_shop.db'
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA_SQL.read_text(encoding='utf-8'))
+    conn.close()
+    return str(path)
+
+
+@pytest.fixture
+def db(db_path):
+    shop = CoffeeShopDB(db_path)
+    yield shop
+    shop.disable_write_behind()
+    shop.db_manager.close_pool()
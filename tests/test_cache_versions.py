@@ -0,0 +1,135 @@
+import sqlite3
+
+import pytest
+
+import app as app_module
+from database import CoffeeShopDB, ReportCache
+
+ITEMS = [{'product_id': 1, 'quantity': 2}, {'product_id': 3, 'quantity': 1}]
+
+
+@pytest.fixture(params=['sql', 'migrated'])
+def versioned_db(request, db_path):
+    """A database built from database_final.sql, or one upgraded by SCHEMA_SCRIPTS"""
+    if request.param == 'migrated':
+        conn = sqlite3.connect(db_path)
+        triggers = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE '%_version'")]
+        for name in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        conn.execute("DROP TABLE CYEAE_DATA_VERSION")
+        conn.execute("DROP TABLE CYEAE_CATALOG_VERSION")
+        conn.commit()
+        conn.close()
+    shop = CoffeeShopDB(db_path)
+    yield shop
+    shop.db_manager.close_pool()
+
+
+def execute(db_path, sql, params=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def data_version(db):
+    return db.get_data_version()[0]
+
+
+def test_order_writes_bump_data_version(versioned_db, db_path):
+    db = versioned_db
+    before = data_version(db)
+    order_id = db.create_order(1, 'Cash', ITEMS)
+    after_insert = data_version(db)
+    assert after_insert > before
+
+    execute(db_path, "UPDATE CYEAE_ORDERS SET TOTAL_AMOUNT = TOTAL_AMOUNT + 1 WHERE ORDER_ID = ?", (order_id,))
+    after_order_update = data_version(db)
+    assert after_order_update > after_insert
+
+    execute(db_path, "UPDATE CYEAE_ORDER_ITEMS SET QUANTITY = QUANTITY + 1 WHERE ORDER_ID = ?", (order_id,))
+    after_item_update = data_version(db)
+    assert after_item_update > after_order_update
+
+    execute(db_path, "DELETE FROM CYEAE_ORDER_ITEMS WHERE ORDER_ID = ?", (order_id,))
+    after_item_delete = data_version(db)
+    assert after_item_delete > after_item_update
+
+    execute(db_path, "DELETE FROM CYEAE_ORDERS WHERE ORDER_ID = ?", (order_id,))
+    assert data_version(db) > after_item_delete
+
+
+def test_customer_writes_bump_data_version(versioned_db, db_path):
+    db = versioned_db
+    versions = [data_version(db)]
+    customer_id = db.create_customer('Version Test', '555-0100', 'version@example.com', 'Somewhere')
+    versions.append(data_version(db))
+    execute(db_path, "UPDATE CYEAE_CUSTOMER SET NAME = 'Renamed' WHERE CUSTOMER_ID = ?", (customer_id,))
+    versions.append(data_version(db))
+    execute(db_path, "DELETE FROM CYEAE_CUSTOMER WHERE CUSTOMER_ID = ?", (customer_id,))
+    versions.append(data_version(db))
+    assert versions == sorted(set(versions))
+
+
+@pytest.mark.parametrize('table, insert, update, delete', [
+    ('PRODUCT',
+     "INSERT INTO CYEAE_PRODUCT (NAME, PRICE, IS_ACTIVE, CATEGORY_ID) VALUES ('Version Brew', 4.5, 1, 1)",
+     "UPDATE CYEAE_PRODUCT SET PRICE = PRICE + 1 WHERE NAME = 'Version Brew'",
+     "DELETE FROM CYEAE_PRODUCT WHERE NAME = 'Version Brew'"),
+    ('CATEGORY',
+     "INSERT INTO CYEAE_CATEGORY (CATEGORY_NAME) VALUES ('Version Beans')",
+     "UPDATE CYEAE_CATEGORY SET CATEGORY_NAME = 'Version Leaves' WHERE CATEGORY_NAME = 'Version Beans'",
+     "DELETE FROM CYEAE_CATEGORY WHERE CATEGORY_NAME = 'Version Leaves'"),
+])
+def test_catalog_writes_bump_catalog_version(versioned_db, db_path, table, insert, update, delete):
+    db = versioned_db
+    versions = [db.get_catalog_version()]
+    for statement in (insert, update, delete):
+        execute(db_path, statement)
+        versions.append(db.get_catalog_version())
+    assert versions == sorted(set(versions))
+    assert db.get_data_version()[1] == versions[-1]
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(app_module, 'db', db)
+    # Re-read the version on every request so each write is visible immediately
+    monkeypatch.setattr(app_module, 'report_cache', ReportCache(db, check_interval=0))
+    monkeypatch.setattr(app_module, 'ANALYTICS_STORE_DIR', None)
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('path', ['/api/reports/sales', '/api/reports/products', '/api/reports/customers'])
+def test_report_etag_revalidates_until_data_changes(client, db, db_path, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+    assert app_module.report_cache.stats()['hits'] == 1
+
+    order_id = db.create_order(1, 'Cash', ITEMS)
+    changed = client.get(path, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+    # In-place edits must invalidate too, not just new orders
+    etag = changed.headers['ETag']
+    execute(db_path, "UPDATE CYEAE_ORDER_ITEMS SET QUANTITY = QUANTITY + 5, LINE_AMOUNT = LINE_AMOUNT * 6 "
+                     "WHERE ORDER_ID = ?", (order_id,))
+    edited = client.get(path, headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert edited.headers['ETag'] != etag
+
+
+def test_report_cache_keys_on_query_args(client, db):
+    db.create_order(1, 'Cash', ITEMS)
+    everything = client.get('/api/reports/sales')
+    one_day = client.get('/api/reports/sales?start_date=2099-01-01')
+    assert everything.headers['ETag'] != one_day.headers['ETag']
+    assert len(everything.get_json()['data']) == 1
+    assert one_day.get_json()['data'] == []
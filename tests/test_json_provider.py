@@ -0,0 +1,52 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from flask import jsonify
+from flask.json.provider import DefaultJSONProvider
+
+orjson = pytest.importorskip('orjson')
+
+import app as app_module
+
+
+@pytest.fixture
+def orjson_calls(monkeypatch):
+    calls = []
+    dumps = orjson.dumps
+
+    def counting_dumps(*args, **kwargs):
+        calls.append(kwargs.get('option'))
+        return dumps(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.orjson, 'dumps', counting_dumps)
+    return calls
+
+
+def test_jsonify_uses_orjson(orjson_calls):
+    app = app_module.app
+    payload = {'b': [datetime(2026, 1, 1), date(2026, 1, 2), Decimal('1.5')], 'a': 1}
+    with app.test_request_context():
+        # Opening the session serializes through app.json too; count only jsonify
+        orjson_calls.clear()
+        body = jsonify(payload).get_data(as_text=True)
+        expected = DefaultJSONProvider(app).response(payload).get_data(as_text=True)
+
+    assert len(orjson_calls) == 1
+    assert body == expected
+
+
+def test_jsonify_indent_maps_to_orjson_option(orjson_calls, monkeypatch):
+    app = app_module.app
+    monkeypatch.setattr(app.json, 'compact', False)
+    with app.test_request_context():
+        orjson_calls.clear()
+        body = jsonify({'b': 1, 'a': 2}).get_data(as_text=True)
+
+    assert orjson_calls == [app.json.options | orjson.OPT_INDENT_2]
+    assert body == '{\n  "a": 2,\n  "b": 1\n}\n'
+
+
+def test_unsupported_arguments_fall_back_to_stdlib(orjson_calls):
+    assert app_module.app.json.dumps({'a': 1}, ensure_ascii=False) == '{"a": 1}'
+    assert orjson_calls == []
@@ -0,0 +1,142 @@
+import sqlite3
+import threading
+
+import pytest
+
+ITEMS = [{'product_id': 1, 'quantity': 2}, {'product_id': 3, 'quantity': 1}]
+
+
+def query(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_concurrent_orders_get_unique_ids(db, db_path):
+    writer = db.enable_write_behind(max_batch=16, flush_interval_ms=5)
+    threads, orders_per_thread = 8, 25
+    order_ids = []
+    errors = []
+    lock = threading.Lock()
+
+    def place(customer_id):
+        try:
+            ids = [db.create_order(customer_id, 'Cash', ITEMS) for _ in range(orders_per_thread)]
+        except Exception as e:
+            errors.append(e)
+            return
+        with lock:
+            order_ids.extend(ids)
+
+    workers = [threading.Thread(target=place, args=(i % 3 + 1,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    assert len(set(order_ids)) == threads * orders_per_thread
+    stored = {row[0] for row in query(db_path, "SELECT ORDER_ID FROM CYEAE_ORDERS")}
+    assert set(order_ids) <= stored
+    assert writer.stats()['orders'] == threads * orders_per_thread
+
+
+def test_rollups_match_order_totals(db, db_path):
+    db.enable_write_behind(max_batch=8, flush_interval_ms=2)
+    workers = [threading.Thread(target=lambda c=c: [db.create_order(c, 'Card', ITEMS) for _ in range(10)])
+               for c in (1, 2, 3, 1)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    daily = query(db_path, "SELECT SALES_DATE, ORDER_COUNT, ROUND(TOTAL_SALES, 2) "
+                           "FROM CYEAE_DAILY_SALES ORDER BY SALES_DATE")
+    expected_daily = query(db_path, "SELECT DATE(ORDER_DATE), COUNT(*), ROUND(SUM(TOTAL_AMOUNT), 2) "
+                                    "FROM CYEAE_ORDERS GROUP BY DATE(ORDER_DATE) ORDER BY 1")
+    assert daily == expected_daily
+
+    customers = query(db_path, "SELECT CUSTOMER_ID, ORDER_COUNT, ROUND(TOTAL_SPENT, 2) "
+                               "FROM CYEAE_CUSTOMER_STATS ORDER BY CUSTOMER_ID")
+    expected_customers = query(db_path, "SELECT CUSTOMER_ID, COUNT(*), ROUND(SUM(TOTAL_AMOUNT), 2) "
+                                        "FROM CYEAE_ORDERS WHERE CUSTOMER_ID IS NOT NULL "
+                                        "GROUP BY CUSTOMER_ID ORDER BY CUSTOMER_ID")
+    assert customers == expected_customers
+
+
+def test_bad_product_fails_only_its_own_order(db, db_path):
+    # A long flush interval puts all three jobs in one batch
+    writer = db.enable_write_behind(max_batch=3, flush_interval_ms=1000)
+    good = writer.submit(db._create_order, 1, 'Cash', ITEMS)
+    bad = writer.submit(db._create_order, 2, 'Cash', [{'product_id': 9999, 'quantity': 1}])
+    also_good = writer.submit(db._create_order, 3, 'Cash', ITEMS)
+
+    order_id, other_id = good.result(timeout=10), also_good.result(timeout=10)
+    with pytest.raises(ValueError, match='9999'):
+        bad.result(timeout=10)
+
+    assert writer.stats()['largest_batch'] == 3
+    assert query(db_path, "SELECT ORDER_ID, COUNT(*) FROM CYEAE_ORDER_ITEMS "
+                          f"WHERE ORDER_ID IN ({order_id}, {other_id}) GROUP BY ORDER_ID") \
+        == [(order_id, 2), (other_id, 2)]
+    assert query(db_path, "SELECT COUNT(*) FROM CYEAE_ORDERS WHERE CUSTOMER_ID = 2") == [(0,)]
+
+
+def test_writer_survives_failed_flush(db, monkeypatch):
+    writer = db.enable_write_behind(flush_interval_ms=1)
+
+    def exhausted():
+        raise sqlite3.OperationalError('connection pool exhausted')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.db_manager, 'get_connection', exhausted)
+        with pytest.raises(sqlite3.OperationalError, match='exhausted'):
+            db.create_order(1, 'Cash', ITEMS)
+
+    assert isinstance(db.create_order(1, 'Cash', ITEMS), int)
+    assert writer.stats()['failed_batches'] == 1
+
+
+def test_failing_commit_hook_keeps_committed_orders(db, db_path):
+    writer = db.enable_write_behind(flush_interval_ms=1)
+
+    def broken_hook():
+        raise RuntimeError('subscriber went away')
+
+    writer.on_commit = broken_hook
+    order_id = db.create_order(1, 'Cash', ITEMS)
+
+    assert query(db_path, f"SELECT COUNT(*) FROM CYEAE_ORDERS WHERE ORDER_ID = {order_id}") == [(1,)]
+    assert writer.stats()['commit_hook_errors'] == 1
+
+
+def test_stop_flushes_queued_orders(db, db_path):
+    writer = db.enable_write_behind(max_batch=64, flush_interval_ms=10000)
+    futures = [writer.submit(db._create_order, 1, 'Cash', ITEMS) for _ in range(5)]
+    db.disable_write_behind()
+
+    order_ids = [future.result(timeout=0) for future in futures]
+    assert len(set(order_ids)) == 5
+    assert not writer._thread.is_alive()
+    assert query(db_path, "SELECT COUNT(*) FROM CYEAE_ORDERS "
+                          f"WHERE ORDER_ID IN ({', '.join(map(str, order_ids))})") == [(5,)]
+
+
+def test_result_wait_is_bounded(db, monkeypatch):
+    writer = db.enable_write_behind(flush_interval_ms=1)
+    writer.result_timeout = 0.05
+    release = threading.Event()
+
+    def slow_write(cursor):
+        release.wait(5)
+        return 'done'
+
+    blocker = writer.submit(slow_write)
+    try:
+        with pytest.raises(sqlite3.OperationalError, match='did not respond'):
+            writer.write(db._create_order, 1, 'Cash', ITEMS)
+    finally:
+        release.set()
+    assert blocker.result(timeout=5) == 'done'